@@ -17,6 +17,9 @@ setuptools.setup(
         "requests>=2.22.0",
         "urllib3>=1.26.0"
     ],
+    extras_require={
+        "async": ["aiohttp>=3.7"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",  # or your choice
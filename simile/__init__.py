@@ -1,11 +1,29 @@
 # simile/__init__.py
+import importlib
 import sys
 from . import config
-from .resource_agent import Agent
-from .resource_population import Population
-from .task import Task
 from .config import configure
 
+# Public names and the submodule defining them. They are imported on first
+# access so `import simile` stays cheap until the library is actually used.
+_LAZY_ATTRIBUTES = {
+    "Agent": "resource_agent",
+    "AsyncAgent": "resource_agent",
+    "Population": "resource_population",
+    "AsyncPopulation": "resource_population",
+    "Task": "task",
+    "AsyncTask": "task",
+    "TaskGroup": "task",
+    "PollSchedule": "task",
+    "MemoryCache": "cache",
+    "DiskCache": "cache",
+    "MetadataCache": "cache",
+    "close_session": "api_requestor",
+    "reset_session": "api_requestor",
+    "Client": "client",
+    "default_client": "client",
+}
+
 class _SimileModuleProxy:
     def __init__(self, real_module):
         self._real_module = real_module
@@ -18,6 +36,11 @@ class _SimileModuleProxy:
             return config.api_base
         elif hasattr(self._real_module, name):
             return getattr(self._real_module, name)
+        elif name in _LAZY_ATTRIBUTES:
+            module = importlib.import_module(f"{__name__}.{_LAZY_ATTRIBUTES[name]}")
+            value = getattr(module, name)
+            setattr(self._real_module, name, value)
+            return value
         else:
             raise AttributeError(f"No attribute {name} in simile")
         
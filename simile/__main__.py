@@ -0,0 +1,30 @@
+# simile/__main__.py
+"""
+Command-line entry point:
+
+    python -m simile run job.json --out results/   # see runner.py
+"""
+
+import sys
+
+COMMANDS = {
+    "run": "Run a question x agent job across processes, with checkpoints (see simile.runner).",
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print("usage: python -m simile <command> [options]\n\ncommands:")
+        for name, description in COMMANDS.items():
+            print(f"  {name:<8} {description}")
+        return 0 if argv and argv[0] in ("-h", "--help") else 2
+
+    if argv[0] == "run":
+        from .runner import main as run_main
+
+        return run_main(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,201 @@
 # simile/api_requestor.py
-import requests
-from . import config
-from .error import AuthenticationError, RequestError, ApiKeyNotSetError
+import functools
+import random
+import time
 
-def request(method, endpoint, params=None, data=None, json=None, headers=None, timeout=30):
-    # Refer back to config.api_key so changes to config are seen here
-    if not config.api_key:
+from . import instrumentation
+from .client import current_client
+from .error import AuthenticationError, RequestError, RateLimitError, ApiKeyNotSetError, TransportError
+from .payload import encode_json, is_one_shot
+from .transport import RequestsTransport
+from .utils import parse_retry_after
+
+
+def get_transport():
+    """
+    Returns the transport of the current client (see client.py), creating it
+    on first use. Transports pool their connections and are safe to share
+    between threads.
+    """
+    return current_client().get_transport()
+
+
+def get_session():
+    """
+    Returns the pooled keep-alive requests.Session of the current client's
+    transport, creating it on first use. Only the "requests" transport has
+    one; use get_transport() to work with any transport.
+    """
+    transport = get_transport()
+    if not isinstance(transport, RequestsTransport):
+        raise TypeError(
+            f"get_session() requires the 'requests' transport, but the current client uses "
+            f"{type(transport).__name__}; use get_transport() instead."
+        )
+    return transport.session
+
+
+def close_session():
+    """
+    Closes the current client's transport and all of its pooled connections.
+    A new one is created lazily on the next request.
+    """
+    current_client().close_session()
+
+
+def reset_session():
+    """
+    Drops the current client's transport (e.g. after changing pool/retry
+    settings or after forking a worker process) so the next request builds a
+    fresh one.
+    """
+    current_client().reset_session()
+
+
+def _jittered(backoff):
+    """Applies "equal jitter" to a backoff delay: keep half, randomize the rest."""
+    if backoff <= 0:
+        return 0
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+def backoff_time(retry_number):
+    """
+    Sleep (seconds) before the given retry (1-based), using the configured
+    exponential backoff, cap and jitter. Shared by the sync and async clients.
+    """
+    if retry_number <= 1:
+        return 0
+    client = current_client()
+    backoff = client.backoff_factor * (2 ** (retry_number - 1))
+    return _jittered(min(backoff, client.backoff_max))
+
+
+def prepare_request(endpoint, headers=None):
+    """
+    Builds the full URL and headers for an API call.
+    Shared by the sync and async clients so both authenticate the same way.
+    """
+    # The default client reads config.api_key live, so changes to config are seen here
+    client = current_client()
+    if not client.api_key:
         raise ApiKeyNotSetError("No API key set. Please set simile.api_key = '...'")
 
     if not endpoint.startswith("/"):
         endpoint = "/" + endpoint
 
-    url = config.api_base.rstrip("/") + endpoint
+    url = client.api_base.rstrip("/") + endpoint
 
     # Common default headers
     default_headers = {
-        "Authorization": f"Api-Key {config.api_key}",
+        "Authorization": f"Api-Key {client.api_key}",
         "Content-Type": "application/json",
+        "Accept-Encoding": "gzip, deflate",
     }
     if headers:
         default_headers.update(headers)
+    return url, default_headers
+
+
+def check_response(status_code, text, retry_after=None):
+    """
+    Raises the matching simile error for an HTTP error status.
+    Shared by the sync and async clients.
+    """
+    # Check for typical authentication or 4xx/5xx issues
+    if status_code == 401:
+        raise AuthenticationError("Invalid or missing API key.")
+    elif status_code == 429:
+        raise RateLimitError(
+            f"Rate limited by server (status 429): {text}",
+            response=text,
+            retry_after=retry_after
+        )
+    elif 400 <= status_code < 600:
+        # For all other error codes, raise a generic error
+        raise RequestError(
+            f"Error from server (status {status_code}): {text}",
+            status_code=status_code,
+            response=text
+        )
+
+
+def encode_request(json, data, headers):
+    """
+    Serializes a JSON payload (see payload.encode_json) into (data, headers).
+    Shared by the sync and async clients.
+    """
+    if json is None:
+        return data, headers
+    data, body_headers = encode_json(json)
+    headers.update(body_headers)
+    return data, headers
+
+
+def throttle_delay(attempt, retry_after):
+    """How long to hold back a class of calls after a 429 response."""
+    return retry_after if retry_after is not None else backoff_time(attempt + 1)
+
 
+def _send(client, limiter, ticket, method, endpoint, url, params, data, headers, timeout, started=None):
+    """
+    One HTTP attempt: takes a limiter slot, sends, and records the outcome with
+    the circuit-breaker ticket. started() is called once the slot is taken.
+    """
+    limiter.acquire()
+    if started is not None:
+        started()
+    resp = None
+    error = None
+    info = instrumentation.request_started(method, endpoint, url)
+    sent_at = time.perf_counter()
     try:
-        resp = requests.request(
-            method=method,
-            url=url,
+        resp = client.get_transport().request(
+            method,
+            url,
             params=params,
             data=data,
-            json=json,
-            headers=default_headers,
+            headers=headers,
             timeout=timeout
         )
-    except requests.exceptions.RequestException as e:
+    except TransportError as e:
+        error = e
         raise RequestError(f"Request error: {e}")
+    finally:
+        status = resp.status_code if resp is not None else None
+        limiter.release(status, parse_retry_after(resp.headers) if resp is not None else None)
+        instrumentation.request_finished(info, status, error)
+        client.get_resilience().record(endpoint, ticket, status, error, time.perf_counter() - sent_at)
+    return resp
 
-    # Check for typical authentication or 4xx/5xx issues
-    if resp.status_code == 401:
-        raise AuthenticationError("Invalid or missing API key.")
-    elif 400 <= resp.status_code < 600:
-        # For all other error codes, raise a generic error
-        raise RequestError(
-            f"Error from server (status {resp.status_code}): {resp.text}",
-            status_code=resp.status_code,
-            response=resp.text
+
+def request(method, endpoint, params=None, data=None, json=None, headers=None, timeout=30):
+    url, default_headers = prepare_request(endpoint, headers)
+    data, default_headers = encode_request(json, data, default_headers)
+    client = current_client()
+    limiter = client.get_governor().limiter(method, endpoint)
+    resilience = client.get_resilience()
+    # A streamed body is consumed by the first attempt
+    retryable = not is_one_shot(data)
+
+    # 429 means the request was not processed, so it is safe to retry any method;
+    # the limiter holds back every caller of this endpoint class meanwhile
+    attempt = 0
+    while True:
+        attempt += 1
+        ticket = resilience.before_call(endpoint)
+        send = functools.partial(
+            client.run, _send, client, limiter, ticket, method, endpoint, url, params, data, default_headers, timeout
         )
+        # Hedging only applies to GETs, which never have a streamed body
+        delay = resilience.hedge_delay(method, endpoint)
+        resp = send() if delay is None else resilience.call(endpoint, delay, send)
+        retry_after = parse_retry_after(resp.headers)
+
+        if resp.status_code == 429 and retryable and attempt <= client.max_retries:
+            limiter.pause(throttle_delay(attempt, retry_after))
+            continue
+        break
 
+    check_response(resp.status_code, resp.text, retry_after)
     return resp
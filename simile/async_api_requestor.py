@@ -0,0 +1,163 @@
+# simile/async_api_requestor.py
+"""
+Non-blocking counterpart of api_requestor, built on aiohttp.
+Install the optional dependency with: pip install simile[async]
+"""
+
+import asyncio
+import functools
+import time
+
+from . import instrumentation
+from .api_requestor import (
+    backoff_time,
+    prepare_request,
+    encode_request,
+    check_response,
+    throttle_delay,
+)
+from .error import RequestError
+from .payload import is_one_shot
+from .client import current_client
+from .transport import RETRY_STATUS_CODES, IDEMPOTENT_METHODS, Response
+from .utils import parse_retry_after
+
+class AsyncResponse(Response):
+    """Fully-read response from the async client."""
+
+
+def _aiohttp():
+    """Imports aiohttp on first use, so that importing simile doesn't pay for it."""
+    try:
+        import aiohttp
+    except ImportError:  # optional dependency
+        raise ImportError(
+            "The async client requires aiohttp. Install it with: pip install simile[async]"
+        ) from None
+    return aiohttp
+
+
+async def get_session():
+    """
+    Returns the current client's pooled keep-alive aiohttp session for the
+    running event loop, creating it on first use. (aiohttp sessions can't be
+    shared across event loops, so each client keeps one per loop.)
+    """
+    aiohttp = _aiohttp()
+    client = current_client()
+    loop = asyncio.get_running_loop()
+    session = client._async_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=client.pool_maxsize)
+        session = aiohttp.ClientSession(connector=connector)
+        client._async_sessions[loop] = session
+    return session
+
+
+async def close_session():
+    """Closes the current client's aiohttp session for the running event loop, if any."""
+    loop = asyncio.get_running_loop()
+    session = current_client()._async_sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+async def _aiter_chunks(chunks):
+    # aiohttp streams async iterables; the chunks themselves are produced synchronously
+    for chunk in chunks:
+        yield chunk
+
+
+async def _send(client, session, limiter, ticket, method, endpoint, url, params, data, headers, timeout, started=None):
+    """
+    One HTTP attempt: takes a limiter slot, sends, and records the outcome with
+    the circuit-breaker ticket. started() is called once the slot is taken.
+    """
+    aiohttp = _aiohttp()
+    await limiter.acquire_async()
+    if started is not None:
+        started()
+    resp = None
+    error = None
+    info = instrumentation.request_started(method, endpoint, url)
+    sent_at = time.perf_counter()
+    try:
+        async with session.request(
+            method,
+            url,
+            params=params,
+            data=data,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as raw:
+            resp = AsyncResponse(raw.status, raw.headers, await raw.text())
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        error = e
+        raise
+    finally:
+        status = resp.status_code if resp is not None else None
+        limiter.release(status, parse_retry_after(resp.headers) if resp is not None else None)
+        instrumentation.request_finished(info, status, error)
+        client.get_resilience().record(endpoint, ticket, status, error, time.perf_counter() - sent_at)
+    return resp
+
+
+async def request(method, endpoint, params=None, data=None, json=None, headers=None, timeout=30):
+    """
+    Async version of api_requestor.request, with the same error handling and
+    the same retry policy for idempotent calls and 502/503/504 responses.
+    Returns an AsyncResponse.
+    """
+    url, default_headers = prepare_request(endpoint, headers)
+    data, default_headers = encode_request(json, data, default_headers)
+    session = await get_session()
+    aiohttp = _aiohttp()
+    client = current_client()
+    limiter = client.get_governor().limiter(method, endpoint)
+    resilience = client.get_resilience()
+    # A streamed body is consumed by the first attempt
+    one_shot = is_one_shot(data)
+    if one_shot:
+        data = _aiter_chunks(data)
+    retryable = method.upper() in IDEMPOTENT_METHODS and not one_shot
+
+    def send(ticket, started=None):
+        return _send(
+            client, session, limiter, ticket, method, endpoint, url, params, data, default_headers, timeout, started
+        )
+
+    attempt = 0
+    while True:
+        attempt += 1
+        ticket = resilience.before_call(endpoint)
+        # Hedging only applies to GETs, which never have a streamed body
+        delay = resilience.hedge_delay(method, endpoint)
+        resp = None
+        error = None
+        try:
+            if delay is None:
+                resp = await send(ticket)
+            else:
+                resp = await resilience.call_async(endpoint, delay, functools.partial(send, ticket))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+
+        if error is not None:
+            # Connection-level failures are only retried for idempotent methods,
+            # since the server might have processed a POST already
+            if retryable and attempt <= client.max_retries:
+                await asyncio.sleep(backoff_time(attempt))
+                continue
+            raise RequestError(f"Request error: {error}")
+
+        retry_after = parse_retry_after(resp.headers)
+        if resp.status_code == 429 and not one_shot and attempt <= client.max_retries:
+            limiter.pause(throttle_delay(attempt, retry_after))
+            continue
+        if retryable and resp.status_code in RETRY_STATUS_CODES and attempt <= client.max_retries:
+            await asyncio.sleep(backoff_time(attempt) if retry_after is None else retry_after)
+            continue
+        break
+
+    check_response(resp.status_code, resp.text, retry_after)
+    return resp
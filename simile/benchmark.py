@@ -0,0 +1,240 @@
+# simile/benchmark.py
+"""
+Client benchmark against the local mock server (see mock_server.py).
+
+Runs a generate_response workload at increasing concurrency and reports
+client throughput, end-to-end task latency (p50/p99), polls per task and
+peak Python memory. Results can be saved and compared against a baseline to
+catch regressions in api_requestor/Task changes:
+
+    python -m simile.benchmark --tasks 1000 --concurrency 1,16,64,256
+    python -m simile.benchmark --json bench.json
+    python -m simile.benchmark --baseline bench.json --tolerance 0.2   # exit 1 on regression
+
+The benchmark runs on its own simile.Client, so the global configuration is
+left untouched. Peak memory is measured in a separate, untimed run, because
+tracing allocations slows the client down (--no-memory skips it).
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+
+from .client import Client
+from .mock_server import API_PREFIX, MockSimileServer, lognormal
+from .resource_agent import Agent, AsyncAgent
+from .task import run_tasks
+from .transport import InMemoryTransport
+
+QUESTION = {"question": "Do you agree?", "options": ["yes", "no"]}
+RESULT_ENDPOINT = "/generate_agent_response_result/{task_id}/"
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _benchmark_client(base, transport):
+    """A client of its own: no caches, journal or rate limits, whatever simile.config says."""
+    return Client("benchmark", api_base=base, transport=transport, rate_limits={})
+
+
+def _run_sync(tasks, concurrency):
+    submitted_at = {}
+    latencies = []
+    failed = 0
+
+    def submit(i):
+        submitted_at[i] = time.perf_counter()
+        return Agent.submit_response(f"agent_{i}", "categorical", QUESTION)
+
+    for i, outcome in run_tasks(range(tasks), submit, concurrency=concurrency):
+        latencies.append(time.perf_counter() - submitted_at[i])
+        if isinstance(outcome, Exception):
+            failed += 1
+    return latencies, failed
+
+
+def _run_async(tasks, concurrency):
+    async def main():
+        from .async_api_requestor import close_session
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        failed = 0
+
+        async def one(i):
+            nonlocal failed
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await AsyncAgent.generate_response(f"agent_{i}", "categorical", QUESTION)
+                except Exception:
+                    failed += 1
+                latencies.append(time.perf_counter() - start)
+
+        try:
+            await asyncio.gather(*(one(i) for i in range(tasks)))
+        finally:
+            await close_session()
+        return latencies, failed
+
+    return asyncio.run(main())
+
+
+def _run_point(tasks, concurrency, mode, transport, trace_memory, server_options):
+    """One run against a fresh mock server; returns (latencies, failed, seconds, peak bytes, server stats)."""
+    server = MockSimileServer(**server_options)
+    if transport == "inmemory":
+        # Same app, called in-process instead of over HTTP
+        client = _benchmark_client("http://simile.test" + API_PREFIX, InMemoryTransport(server.app))
+    else:
+        server.start()
+        client = _benchmark_client(server.url, transport)
+    peak = None
+    try:
+        with client, client.activate():
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                if mode == "async":
+                    latencies, failed = _run_async(tasks, concurrency)
+                else:
+                    latencies, failed = _run_sync(tasks, concurrency)
+                elapsed = time.perf_counter() - start
+                if trace_memory:
+                    _, peak = tracemalloc.get_traced_memory()
+            finally:
+                if trace_memory:
+                    tracemalloc.stop()
+    finally:
+        server.stop()
+    return latencies, failed, elapsed, peak, server.app.stats
+
+
+def run_benchmark(tasks=500, concurrency=32, mode="sync", transport="requests", measure_memory=True, **server_options):
+    """
+    Runs one benchmark point and returns its measurements as a dict.
+    transport is "requests", "urllib3" or "inmemory" (no sockets) for sync mode.
+    server_options are passed to MockSimileApp (task_latency, queue_delay,
+    task_failure_rate, http_error_rate, max_requests_per_second, ...).
+
+    Timings come from an untraced run; with measure_memory, the same workload
+    is run again under tracemalloc for peak_memory_mb (None otherwise).
+    """
+    if mode == "async" and transport != "requests":
+        raise ValueError("The async client always uses aiohttp; transport only applies to sync mode.")
+    latencies, failed, elapsed, _, stats = _run_point(tasks, concurrency, mode, transport, False, server_options)
+    peak = None
+    if measure_memory:
+        peak = _run_point(tasks, concurrency, mode, transport, True, server_options)[3]
+
+    latencies.sort()
+    polls = stats["by_endpoint"].get(RESULT_ENDPOINT, 0)
+    return {
+        "mode": mode,
+        "transport": transport,
+        "concurrency": concurrency,
+        "tasks": tasks,
+        "failed": failed,
+        "seconds": elapsed,
+        "throughput": tasks / elapsed if elapsed else 0.0,
+        "p50": _percentile(latencies, 0.5),
+        "p99": _percentile(latencies, 0.99),
+        "polls": polls,
+        "polls_per_task": polls / tasks if tasks else 0.0,
+        "requests": stats["requests"],
+        "throttled": stats["throttled"],
+        "peak_memory_mb": peak / 2 ** 20 if peak is not None else None,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of human-readable regressions of results against a baseline
+    (matched on mode, transport and concurrency): lower throughput or higher p99 latency
+    by more than `tolerance` (a fraction).
+    """
+    previous = {(r["mode"], r.get("transport", "requests"), r["concurrency"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["mode"], result["transport"], result["concurrency"]))
+        if before is None:
+            continue
+        label = f"{result['mode']}/{result['transport']} c={result['concurrency']}"
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: throughput {result['throughput']:.1f}/s < baseline {before['throughput']:.1f}/s"
+            )
+        if before["p99"] and result["p99"] > before["p99"] * (1 + tolerance):
+            regressions.append(f"{label}: p99 {result['p99']:.3f}s > baseline {before['p99']:.3f}s")
+    return regressions
+
+
+def _print_table(results):
+    header = f"{'mode':>5} {'transport':>9} {'conc':>5} {'tasks/s':>9} {'p50 s':>7} {'p99 s':>7} {'polls/task':>10} {'429s':>5} {'fail':>5} {'peak MB':>8}"
+    print(header)
+    for r in results:
+        print(
+            f"{r['mode']:>5} {r['transport']:>9} {r['concurrency']:>5} {r['throughput']:>9.1f} {r['p50']:>7.3f} {r['p99']:>7.3f} "
+            f"{r['polls_per_task']:>10.2f} {r['throttled']:>5} {r['failed']:>5} "
+            + (f"{r['peak_memory_mb']:>8.1f}" if r["peak_memory_mb"] is not None else f"{'-':>8}")
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m simile.benchmark", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, default=500, help="tasks per benchmark point")
+    parser.add_argument("--concurrency", default="1,8,32,128", help="comma-separated concurrency levels")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--transport", choices=("requests", "urllib3", "inmemory"), default="requests")
+    parser.add_argument("--task-latency", type=float, default=0.5, help="median server task time (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal sigma of task time")
+    parser.add_argument("--queue-delay", type=float, default=0.0, help="median PENDING time (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of tasks that fail")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--max-rps", type=float, default=None, help="server throttles (429) above this rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the separate peak-memory run")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression (fraction)")
+    args = parser.parse_args(argv)
+
+    server_options = {
+        "task_latency": lognormal(args.task_latency, args.latency_sigma),
+        "queue_delay": lognormal(args.queue_delay, args.latency_sigma) if args.queue_delay else 0.0,
+        "task_failure_rate": args.failure_rate,
+        "http_error_rate": args.error_rate,
+        "max_requests_per_second": args.max_rps,
+        "seed": args.seed,
+    }
+    results = []
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        results.append(run_benchmark(
+            args.tasks, concurrency, args.mode, args.transport, not args.no_memory, **server_options
+        ))
+    _print_table(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION:", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+# simile/cache.py
+"""
+Client-side caches.
+
+Both response-cache backends share the same small interface
+(get/set/delete/clear/stats), so either can be plugged in as the response cache:
+
+    simile.configure(response_cache=MemoryCache(maxsize=10000, ttl=3600))
+    simile.configure(response_cache=DiskCache("~/.simile/responses.db"))
+
+MetadataCache holds agent details and population membership, revalidates
+with ETags, and is invalidated by the library's own writes:
+
+    simile.configure(metadata_cache=MetadataCache(ttl=60))
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from . import coalesce
+from .client import current_client
+from .api_requestor import request
+from .async_api_requestor import request as arequest
+from .utils import canonical_hash
+
+
+class _Stats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self, size):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": size,
+        }
+
+
+class MemoryCache:
+    """
+    Thread-safe in-memory LRU cache with an optional time-to-live (seconds).
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.time():
+                    self._data.move_to_end(key)
+                    self._stats.hits += 1
+                    return value
+                del self._data[key]
+            self._stats.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Returns {"hits", "misses", "hit_rate", "size"} for this cache."""
+        with self._lock:
+            return self._stats.as_dict(len(self._data))
+
+
+class DiskCache:
+    """
+    Persistent cache in a SQLite file, safe to share between threads and between
+    processes (e.g. several notebooks or pipeline reruns). Values must be
+    JSON-serializable. Hit/miss counts are per process.
+    """
+    def __init__(self, path, ttl=None):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL)"
+        )
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                value, expires_at = row
+                if expires_at is None or expires_at > time.time():
+                    self._stats.hits += 1
+                    return json.loads(value)
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._stats.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def stats(self):
+        """Returns {"hits", "misses", "hit_rate", "size"} for this cache."""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            return self._stats.as_dict(size)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def response_cache_key(agent_id, question_type, question_payload):
+    """Canonical cache key for one generate_response call."""
+    return canonical_hash({
+        "base": current_client().api_base,
+        "agent_id": agent_id,
+        "question_type": question_type,
+        "question": question_payload,
+    })
+
+
+class MetadataCache:
+    """
+    Thread-safe cache for agent details and population agent-id lists.
+
+    Entries are served without a request for `ttl` seconds. After that, if the
+    server sent an ETag, the entry is revalidated with If-None-Match and a 304
+    response renews it without re-downloading the body. Writes made through
+    this library (add/remove agent, deletes, creates) evict the affected entries.
+    """
+    def __init__(self, ttl=60, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> [fetched_at, etag, value]
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+        self._version = 0       # bumped by every invalidation
+        self.revalidations = 0  # 304 Not Modified responses
+
+    @property
+    def version(self):
+        """
+        Changes whenever entries are invalidated. A fetch that started before an
+        invalidation must not store its (possibly stale) result afterwards.
+        """
+        return self._version
+
+    def lookup(self, key):
+        """Returns (value, etag, fresh) for a cached key, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            fetched_at, etag, value = entry
+            fresh = self.ttl is None or time.time() - fetched_at < self.ttl
+            if fresh:
+                self._stats.hits += 1
+                self._data.move_to_end(key)
+            else:
+                self._stats.misses += 1
+            return value, etag, fresh
+
+    def store(self, key, value, etag=None, version=None):
+        """Caches a fetched value, unless entries were invalidated since `version`."""
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._data[key] = [time.time(), etag, value]
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def touch(self, key):
+        """Marks an entry as fresh again after a 304 Not Modified."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                entry[0] = time.time()
+                self._data.move_to_end(key)
+            self.revalidations += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._version += 1
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Evicts every entry for which predicate(key, value) is true."""
+        with self._lock:
+            self._version += 1
+            for key in [k for k, entry in self._data.items() if predicate(k, entry[2])]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._data.clear()
+
+    def stats(self):
+        """Returns {"hits", "misses", "hit_rate", "size", "revalidations"}."""
+        with self._lock:
+            stats = self._stats.as_dict(len(self._data))
+            stats["revalidations"] = self.revalidations
+            return stats
+
+
+def agent_key(agent_id):
+    return ("agent", current_client().api_base, agent_id)
+
+
+def population_key(population_id):
+    return ("population", current_client().api_base, population_id)
+
+
+def invalidate_agent(agent_id, deleted=False):
+    """
+    Evicts cached details for an agent. If the agent was deleted, it is also
+    evicted from every cached population membership list that contains it.
+    """
+    coalesce.bump_generation()
+    cache = current_client().metadata_cache
+    if cache is None:
+        return
+    cache.invalidate(agent_key(agent_id))
+    if deleted:
+        cache.invalidate_where(
+            lambda key, value: key[0] == "population" and agent_id in value.get("agent_ids", ())
+        )
+
+
+def invalidate_population(population_id):
+    """Evicts the cached membership list of a population."""
+    coalesce.bump_generation()
+    cache = current_client().metadata_cache
+    if cache is not None and population_id:
+        cache.invalidate(population_key(population_id))
+
+
+def _cached_lookup(key, refresh):
+    """Returns (cache, entry or None, headers for the conditional request, version)."""
+    cache = current_client().metadata_cache
+    if cache is None:
+        return None, None, None, None
+    version = cache.version
+    entry = None if refresh else cache.lookup(key)
+    headers = None
+    if entry is not None and not entry[2] and entry[1]:
+        headers = {"If-None-Match": entry[1]}
+    return cache, entry, headers, version
+
+
+def _cached_store(cache, key, entry, resp, version):
+    if resp.status_code == 304 and entry is not None:
+        cache.touch(key)
+        return copy.deepcopy(entry[0])
+    value = resp.json()
+    cache.store(key, value, resp.headers.get("ETag"), version=version)
+    return copy.deepcopy(value)
+
+
+def _read_flight_key(key):
+    # Reads issued after one of our writes start a new flight (see coalesce.py)
+    return (coalesce.generation(), key)
+
+
+def cached_get(key, endpoint, params, refresh=False):
+    """
+    GET a metadata endpoint through the client's metadata_cache (if configured).
+    refresh=True ignores the cached copy and re-fetches it. Identical
+    concurrent fetches are coalesced (coalesce_reads setting).
+    """
+    cache, entry, headers, version = _cached_lookup(key, refresh)
+    if entry is not None and entry[2]:
+        return copy.deepcopy(entry[0])
+
+    def fetch():
+        if cache is None:
+            return request("GET", endpoint, params=params).json()
+        resp = request("GET", endpoint, params=params, headers=headers)
+        return _cached_store(cache, key, entry, resp, version)
+
+    client = current_client()
+    if not client.coalesce_reads:
+        return fetch()
+    return client.reads.do(_read_flight_key(key), fetch)
+
+
+async def async_cached_get(key, endpoint, params, refresh=False):
+    """Async version of cached_get."""
+    cache, entry, headers, version = _cached_lookup(key, refresh)
+    if entry is not None and entry[2]:
+        return copy.deepcopy(entry[0])
+
+    async def fetch():
+        if cache is None:
+            return (await arequest("GET", endpoint, params=params)).json()
+        resp = await arequest("GET", endpoint, params=params, headers=headers)
+        return _cached_store(cache, key, entry, resp, version)
+
+    client = current_client()
+    if not client.coalesce_reads:
+        return await fetch()
+    return await client.reads.do_async(_read_flight_key(key), fetch)
@@ -0,0 +1,373 @@
+# simile/client.py
+"""
+Instance-scoped clients.
+
+A Client holds its own settings (API key, base URL, pool and retry settings,
+...) and its own runtime state: HTTP transport and connection pool,
+rate-limit governor, hedging and circuit-breaker state, caches, task journal
+and single-flight groups. The
+usual API is exposed on it, bound to that client:
+
+    tenant = simile.Client("key-1", pool_maxsize=64)
+    agent_id = tenant.Agent.create("Ada", "Lovelace", population_id=pid)
+    answer = await tenant.AsyncAgent.generate_response(agent_id, "chat", {"question": "..."})
+
+Clients share nothing with each other, so threads or tenants using
+different clients never race on settings or compete for one pool.
+
+The module-level API (simile.Agent, simile.configure, ...) uses the default
+client, whose settings are the globals in simile.config. Code can also be
+run against a client with `with client.activate(): ...` or client.run(fn).
+Tasks remember the client that submitted them.
+"""
+
+import contextlib
+import contextvars
+import functools
+import importlib
+import inspect
+import threading
+import weakref
+
+from . import config
+from .coalesce import SingleFlight
+
+# Settings a new Client copies from simile.config unless given explicitly
+INHERITED_SETTINGS = (
+    "transport",
+    "pool_connections",
+    "pool_maxsize",
+    "pool_block",
+    "max_retries",
+    "backoff_factor",
+    "backoff_max",
+    "rate_limits",
+    "compression",
+    "compression_threshold",
+    "coalesce_reads",
+    "coalesce_responses",
+    "hedging",
+    "circuit_breaker",
+)
+
+# Settings that belong to one tenant and are never inherited
+TENANT_SETTINGS = ("api_key", "api_base", "task_journal", "response_cache", "metadata_cache")
+
+_current = contextvars.ContextVar("simile_client", default=None)
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    """Returns the client behind the module-level API (settings from simile.config)."""
+    global _default
+    client = _default
+    if client is None:
+        with _default_lock:
+            if _default is None:
+                _default = _DefaultClient()
+            client = _default
+    return client
+
+
+def current_client():
+    """Returns the client activated in this context, or the default client."""
+    client = _current.get()
+    return client if client is not None else default_client()
+
+
+def _bind_generator(gen, client):
+    try:
+        while True:
+            with client.activate():
+                try:
+                    item = next(gen)
+                except StopIteration as e:
+                    return e.value
+            yield item
+    finally:
+        with client.activate():
+            gen.close()
+
+
+async def _bind_async_generator(agen, client):
+    try:
+        while True:
+            with client.activate():
+                try:
+                    item = await agen.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield item
+    finally:
+        with client.activate():
+            await agen.aclose()
+
+
+def _bind_function(fn, client):
+    """Wraps fn so that it (and any generator it returns) runs with client active."""
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        def bound(*args, **kwargs):
+            return _bind_async_generator(fn(*args, **kwargs), client)
+    elif inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def bound(*args, **kwargs):
+            with client.activate():
+                return await fn(*args, **kwargs)
+    else:
+        @functools.wraps(fn)
+        def bound(*args, **kwargs):
+            with client.activate():
+                result = fn(*args, **kwargs)
+            if inspect.isgenerator(result):
+                return _bind_generator(result, client)
+            return result
+    return bound
+
+
+def _bind_class(cls, client):
+    """Subclass of cls whose constructor, static and class methods run with client active."""
+    namespace = {"__module__": cls.__module__, "__doc__": cls.__doc__}
+    if cls.__init__ is not object.__init__:
+        @functools.wraps(cls.__init__)
+        def __init__(self, *args, **kwargs):
+            with client.activate():
+                cls.__init__(self, *args, **kwargs)
+
+        namespace["__init__"] = __init__
+    for name, attr in vars(cls).items():
+        if isinstance(attr, staticmethod):
+            namespace[name] = staticmethod(_bind_function(attr.__func__, client))
+        elif isinstance(attr, classmethod):
+            namespace[name] = classmethod(_bind_function(attr.__func__, client))
+    return type(cls.__name__, (cls,), namespace)
+
+
+class Client:
+    """
+    An independent API client. api_key is required; api_base and the
+    INHERITED_SETTINGS (transport, pool_maxsize, max_retries, rate_limits, ...)
+    default to the current simile.config values. journal, response_cache and
+    metadata_cache are per tenant and default to off.
+    """
+    def __init__(self, api_key, api_base=None, journal=None, response_cache=None, metadata_cache=None, **settings):
+        unknown = set(settings) - set(INHERITED_SETTINGS)
+        if unknown:
+            raise TypeError(f"Unknown Client setting(s): {', '.join(sorted(unknown))}.")
+        if not api_key:
+            raise ValueError("api_key is required.")
+        self.api_key = api_key
+        self.api_base = api_base or config.api_base
+        for name in INHERITED_SETTINGS:
+            setattr(self, name, settings.get(name, getattr(config, name)))
+        if "transport" not in settings:
+            from .transport import Transport
+
+            if isinstance(self.transport, Transport):
+                # A transport instance holds a connection pool; don't share the default client's
+                self.transport = self.transport.clone()
+        self.rate_limits = dict(self.rate_limits or {})
+        self.task_journal = journal
+        self.response_cache = response_cache
+        self.metadata_cache = metadata_cache
+        self._init_state()
+
+    def _init_state(self):
+        self._lock = threading.Lock()
+        self._transport = None
+        self._governor = None
+        self._resilience = None
+        self._journal = None
+        self._async_sessions = weakref.WeakKeyDictionary()  # event loop -> aiohttp session
+        self._bound = {}
+        self.reads = SingleFlight()      # coalesced metadata reads
+        self.responses = SingleFlight()  # coalesced generate_response calls
+        self.write_generation = 0        # bumped by writes; part of read flight keys
+
+    def bump_generation(self):
+        with self._lock:
+            self.write_generation += 1
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.api_base}>"
+
+    # --- activation ------------------------------------------------------
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Makes this the current client for the enclosed code (this thread/task only)."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def run(self, fn, *args, **kwargs):
+        """Calls fn(*args, **kwargs) with this client active, e.g. from a worker thread."""
+        with self.activate():
+            return fn(*args, **kwargs)
+
+    # --- runtime state -----------------------------------------------------
+
+    def get_transport(self):
+        """Returns this client's transport (connection pool), creating it on first use."""
+        transport = self._transport
+        if transport is None:
+            from .transport import build_transport
+
+            with self._lock:
+                if self._transport is None:
+                    self._transport = build_transport(self.transport)
+                transport = self._transport
+        return transport
+
+    def close_session(self):
+        """Closes this client's transport; a new one is created on the next request."""
+        with self._lock:
+            transport, self._transport = self._transport, None
+        if transport is not None:
+            transport.close()
+
+    def reset_session(self):
+        """Drops the transport so pool/retry setting changes take effect (or after a fork)."""
+        self.close_session()
+
+    def get_governor(self):
+        """Returns this client's rate-limit Governor (see rate_limit.py)."""
+        governor = self._governor
+        if governor is None:
+            from .rate_limit import Governor
+
+            with self._lock:
+                if self._governor is None:
+                    self._governor = Governor(self.rate_limits)
+                governor = self._governor
+        return governor
+
+    def reset_governor(self):
+        """Drops the Governor so the next call rebuilds it from rate_limits."""
+        with self._lock:
+            self._governor = None
+
+    def get_resilience(self):
+        """Returns this client's hedging and circuit-breaker state (see resilience.py)."""
+        resilience = self._resilience
+        if resilience is None:
+            from .resilience import Resilience
+
+            with self._lock:
+                if self._resilience is None:
+                    # Room for a hedge next to every pooled primary
+                    self._resilience = Resilience(self.hedging, self.circuit_breaker, 2 * self.pool_maxsize)
+                resilience = self._resilience
+        return resilience
+
+    def reset_resilience(self):
+        """Drops breaker and latency state so the next call rebuilds it from the settings."""
+        with self._lock:
+            resilience, self._resilience = self._resilience, None
+        if resilience is not None:
+            resilience.close()
+
+    def get_journal(self):
+        """Returns the TaskJournal for task_journal, or None if journaling is off."""
+        path = self.task_journal
+        if not path:
+            return None
+        journal = self._journal
+        if journal is None or journal.path != path:
+            from .journal import TaskJournal
+
+            with self._lock:
+                if self._journal is None or self._journal.path != path:
+                    if self._journal is not None:
+                        self._journal.close()
+                    self._journal = TaskJournal(path)
+                journal = self._journal
+        return journal
+
+    def close(self):
+        """Closes the transport and task journal. aiohttp sessions need aclose()."""
+        self.close_session()
+        self.reset_resilience()
+        with self._lock:
+            journal, self._journal = self._journal, None
+        if journal is not None:
+            journal.close()
+
+    async def aclose(self):
+        """Closes the aiohttp session of the running event loop, then everything else."""
+        from .async_api_requestor import close_session
+
+        with self.activate():
+            await close_session()
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    # --- bound API ---------------------------------------------------------
+
+    def _bind(self, module, name):
+        bound = self._bound.get(name)
+        if bound is None:
+            cls = getattr(importlib.import_module(f"{__package__}.{module}"), name)
+            bound = self._bound[name] = _bind_class(cls, self)
+        return bound
+
+    @property
+    def Agent(self):
+        return self._bind("resource_agent", "Agent")
+
+    @property
+    def AsyncAgent(self):
+        return self._bind("resource_agent", "AsyncAgent")
+
+    @property
+    def Population(self):
+        return self._bind("resource_population", "Population")
+
+    @property
+    def AsyncPopulation(self):
+        return self._bind("resource_population", "AsyncPopulation")
+
+    @property
+    def Task(self):
+        return self._bind("task", "Task")
+
+    @property
+    def AsyncTask(self):
+        return self._bind("task", "AsyncTask")
+
+    def TaskGroup(self, *args, **kwargs):
+        """Creates a task.TaskGroup that submits and polls through this client."""
+        from .task import TaskGroup
+
+        return self.run(TaskGroup, *args, **kwargs)
+
+    def run_tasks(self, keys, submit, **kwargs):
+        """task.run_tasks through this client."""
+        from .task import run_tasks
+
+        return _bind_function(run_tasks, self)(keys, submit, **kwargs)
+
+
+class _DefaultClient(Client):
+    """The module-level client: its settings are read live from simile.config."""
+    def __init__(self):
+        self._init_state()
+
+    def __getattr__(self, name):
+        if name in INHERITED_SETTINGS or name in TENANT_SETTINGS:
+            return getattr(config, name)
+        raise AttributeError(name)
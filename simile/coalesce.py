@@ -0,0 +1,172 @@
+# simile/coalesce.py
+"""
+In-flight request coalescing ("single flight").
+
+When several threads (or coroutines) make the same call at the same time,
+only the first one goes to the server; the others wait for it and get a copy
+of its result (or its exception). Each client has two groups:
+
+  * reads: Agent.retrieve_details and Population.get_agents (on by default,
+    the client's coalesce_reads setting)
+  * responses: Agent.generate_response, where identical concurrent questions
+    share one server task (off by default, coalesce_responses)
+
+Reads never join a flight that started before one of the library's own
+writes through the same client (see bump_generation), so write-then-read
+stays consistent.
+
+    from simile import coalesce
+
+    simile.configure(coalesce_responses=True)
+    coalesce.stats()  # {"reads": {"calls", "collapsed", "in_flight"}, ...}
+"""
+
+import asyncio
+import copy
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class _AsyncFlight:
+    def __init__(self, future):
+        self.future = future
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers with the same
+    key share its outcome. The leader keeps the object fn() returned; the flight
+    keeps a private copy of it, of which each follower gets its own deep copy,
+    so no caller can affect another.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}        # key -> _Flight
+        self._async_flights = {}  # (event loop id, key) -> _AsyncFlight
+        self.calls = 0
+        self.collapsed = 0
+
+    def do(self, key, fn):
+        """Returns fn(), or the result of an identical call already in flight."""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+                self.collapsed += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        result = None
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                followers = flight.followers
+            try:
+                if followers and flight.error is None:
+                    flight.result = copy.deepcopy(result)
+            except Exception as e:
+                flight.error = e
+            finally:
+                flight.done.set()
+        return result
+
+    async def do_async(self, key, fn):
+        """Async version of do(); fn returns an awaitable. Coalesces within one event loop."""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            self.calls += 1
+            flight = self._async_flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._async_flights[flight_key] = _AsyncFlight(loop.create_future())
+            else:
+                flight.followers += 1
+                self.collapsed += 1
+        future = flight.future
+
+        if not leader:
+            try:
+                # shield: a cancelled follower must not cancel the shared call
+                return copy.deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            # The leader was cancelled; make the call ourselves
+            return await self.do_async(key, fn)
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve it so an unobserved failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._async_flights[flight_key]
+        try:
+            future.set_result(copy.deepcopy(result) if flight.followers else result)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+        return result
+
+    def stats(self):
+        """Returns {"calls", "collapsed", "in_flight"}."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "collapsed": self.collapsed,
+                "in_flight": len(self._flights) + len(self._async_flights),
+            }
+
+
+def _current_client():
+    # Imported here because client.py builds on this module
+    from .client import current_client
+
+    return current_client()
+
+
+def generation():
+    """
+    The current client's write counter, bumped by every write the library
+    makes through that client; part of read flight keys.
+    """
+    return _current_client().write_generation
+
+
+def bump_generation():
+    """Called on writes so that later reads don't join flights started before them."""
+    _current_client().bump_generation()
+
+
+def stats():
+    """Returns the counters of the current client's flight groups."""
+    client = _current_client()
+    return {"reads": client.reads.stats(), "responses": client.responses.stats()}
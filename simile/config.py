@@ -1,21 +1,163 @@
 # simile/config.py
 """
 Holds global configurations for the simile library.
+These are the settings of the default client (see client.py); a
+simile.Client copies the connection settings from here when it is created.
 """
 
 # Default global configs
 api_key = None  # The user must set this before making calls
 api_base = "https://agentbank-f515f1977c64.herokuapp.com/agents/api"  # default; override if needed
 
-def configure(key=None, base=None):
+# Connection pool settings for the shared HTTP session (see api_requestor)
+pool_connections = 10  # number of distinct hosts to keep pools for
+pool_maxsize = 32      # max keep-alive connections per host
+pool_block = False     # if True, wait for a free connection instead of opening an extra one
+
+# HTTP transport: "requests", "urllib3" or a transport.Transport instance (see transport.py)
+transport = "requests"
+
+# Request body compression: None (off), "gzip" or "deflate"; bodies of at least
+# compression_threshold bytes, and all streamed bodies, are compressed (see payload.py)
+compression = None
+compression_threshold = 64 * 1024
+
+# Automatic retries for idempotent calls and transient 502/503/504 responses
+max_retries = 3
+backoff_factor = 0.5   # sleep ~ backoff_factor * 2**(retry - 1), plus jitter
+backoff_max = 30       # upper bound (seconds) on a single backoff sleep
+
+# Path of an optional SQLite task journal (see journal.py); None disables it
+task_journal = None
+
+# Optional cache for Agent.generate_response (a cache.MemoryCache or cache.DiskCache)
+response_cache = None
+
+# Client-side rate limits per endpoint class ("submit", "poll", "metadata"), e.g.
+# {"submit": {"rate": 20, "burst": 40, "max_in_flight": 64}}; see rate_limit.py.
+# Limits adapt to 429/503 responses even when none are configured.
+rate_limits = {}
+
+# Optional cache.MetadataCache for agent details and population membership
+metadata_cache = None
+
+# Coalesce identical concurrent calls into one request (see coalesce.py):
+# metadata reads, and optionally generate_response calls (which share one task)
+coalesce_reads = True
+coalesce_responses = False
+
+# Hedged GETs and per-endpoint circuit breakers (see resilience.py): None (off),
+# True for the defaults, or a dict of settings, e.g. {"quantile": 0.95} and
+# {"failure_threshold": 5, "reset_timeout": 30}
+hedging = None
+circuit_breaker = None
+
+def configure(
+    key=None,
+    base=None,
+    pool_connections=None,
+    pool_maxsize=None,
+    pool_block=None,
+    max_retries=None,
+    backoff_factor=None,
+    backoff_max=None,
+    journal=None,
+    response_cache=None,
+    metadata_cache=None,
+    rate_limits=None,
+    transport=None,
+    compression=None,
+    compression_threshold=None,
+    coalesce_reads=None,
+    coalesce_responses=None,
+    hedging=None,
+    circuit_breaker=None
+):
     """
     Convenience function to set global API key/base from user code.
     Example:
         import simile
         simile.configure(key="abc123", base="https://example.com/agents/api")
+
+    Changing the transport or any of the connection pool or retry settings
+    resets the shared HTTP transport so the next request picks them up.
+
+    journal is the path of a SQLite file used to record in-flight tasks so an
+    interrupted worker can resume them (pass False to turn journaling off).
+
+    response_cache is a MemoryCache/DiskCache used by Agent.generate_response
+    (pass False to turn response caching off).
+
+    metadata_cache is a MetadataCache used by Agent.retrieve_details and
+    Population.get_agents (pass False to turn it off).
+
+    rate_limits sets per-endpoint-class limits for the client-side governor
+    (see rate_limit.py); it replaces any earlier setting.
+
+    transport selects how HTTP requests are sent: "requests" (default),
+    "urllib3", or a transport.Transport instance such as InMemoryTransport.
+
+    compression ("gzip" or "deflate"; pass False to turn it off) compresses
+    request bodies of at least compression_threshold bytes (see payload.py).
+
+    coalesce_reads / coalesce_responses turn single-flight coalescing of
+    identical concurrent metadata reads / generate_response calls on or off.
+
+    hedging / circuit_breaker turn on hedged GETs and per-endpoint circuit
+    breakers (True for the defaults or a dict of settings; False turns them
+    off); see resilience.py.
     """
-    global api_key, api_base
+    global api_key, api_base, task_journal
     if key is not None:
         api_key = key
     if base is not None:
         api_base = base
+    if journal is not None:
+        task_journal = journal or None
+    if response_cache is not None:
+        # These parameters shadow the module globals, hence globals()
+        globals()["response_cache"] = response_cache if response_cache is not False else None
+    if metadata_cache is not None:
+        globals()["metadata_cache"] = metadata_cache if metadata_cache is not False else None
+    if compression is not None:
+        if compression not in (False, "gzip", "deflate"):
+            raise ValueError("compression must be 'gzip', 'deflate' or False.")
+        globals()["compression"] = compression or None
+    if compression_threshold is not None:
+        globals()["compression_threshold"] = compression_threshold
+    if coalesce_reads is not None:
+        globals()["coalesce_reads"] = bool(coalesce_reads)
+    if coalesce_responses is not None:
+        globals()["coalesce_responses"] = bool(coalesce_responses)
+    if hedging is not None or circuit_breaker is not None:
+        if hedging is not None:
+            globals()["hedging"] = hedging or None
+        if circuit_breaker is not None:
+            globals()["circuit_breaker"] = circuit_breaker or None
+        from .client import default_client
+        default_client().reset_resilience()
+    if rate_limits is not None:
+        globals()["rate_limits"] = dict(rate_limits)
+        # Imported here to avoid a circular import (client imports config)
+        from .client import default_client
+        default_client().reset_governor()
+
+    session_settings = {
+        "pool_connections": pool_connections,
+        "pool_maxsize": pool_maxsize,
+        "pool_block": pool_block,
+        "max_retries": max_retries,
+        "backoff_factor": backoff_factor,
+        "backoff_max": backoff_max,
+        "transport": transport,
+    }
+    changed = False
+    for name, value in session_settings.items():
+        if value is not None:
+            globals()[name] = value
+            changed = True
+
+    if changed:
+        # Imported here to avoid a circular import (client imports config)
+        from .client import default_client
+        default_client().reset_session()
@@ -14,3 +14,19 @@ class RequestError(Exception):
         super().__init__(message)
         self.status_code = status_code
         self.response = response
+
+class RateLimitError(RequestError):
+    """The server kept throttling (HTTP 429) after all retries."""
+    def __init__(self, message, status_code=429, response=None, retry_after=None):
+        super().__init__(message, status_code=status_code, response=response)
+        self.retry_after = retry_after
+
+class TransportError(Exception):
+    """A transport could not complete a request (connection failure, timeout, ...)."""
+    pass
+
+class CircuitOpenError(RequestError):
+    """An endpoint's circuit breaker is open, so the call was not made (see resilience.py)."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
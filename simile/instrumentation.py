@@ -0,0 +1,244 @@
+# simile/instrumentation.py
+"""
+Request and task instrumentation.
+
+Built-in, always-on metrics (a lock and a few additions per call):
+  * request latency histograms per (method, endpoint, status)
+  * task lifecycle metrics per result endpoint: end-to-end duration, time
+    queued before the server reported it running, polls used, and how much
+    of the polling delay was wasted after the task had already finished
+
+Export them with snapshot() (plain dict) or prometheus_text() (Prometheus
+text exposition format). Register hooks to forward events elsewhere:
+
+    from simile import instrumentation
+
+    instrumentation.add_request_hook(after=lambda info: print(info["endpoint"], info["elapsed"]))
+    instrumentation.add_task_hook(lambda event, task, info: ...)  # "submitted", "running", "finished"
+"""
+
+import bisect
+import re
+import threading
+import time
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_TASK_ID_RE = re.compile(r"(_result/)[^/]+(/?)$")
+
+_lock = threading.Lock()
+_request_metrics = {}  # (method, endpoint, status) -> _Histogram
+_task_metrics = {}     # result endpoint -> _TaskMetrics
+_before_request_hooks = []
+_after_request_hooks = []
+_task_hooks = []
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Approximate quantile (upper bound of the bucket holding it)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip(LATENCY_BUCKETS + (float("inf"),), self.counts)),
+        }
+
+
+class _TaskMetrics:
+    def __init__(self):
+        self.duration = _Histogram()
+        self.queued = _Histogram()
+        self.wasted = _Histogram()
+        self.succeeded = 0
+        self.failed = 0
+        self.polls = 0
+
+    def as_dict(self):
+        finished = self.succeeded + self.failed
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "polls": self.polls,
+            "polls_per_task": self.polls / finished if finished else 0.0,
+            "duration_seconds": self.duration.as_dict(),
+            "queued_seconds": self.queued.as_dict(),
+            "wasted_wait_seconds": self.wasted.as_dict(),
+        }
+
+
+def endpoint_template(endpoint):
+    """Collapses task ids so metrics group by endpoint: /x_result/abc/ -> /x_result/{task_id}/."""
+    return _TASK_ID_RE.sub(r"\1{task_id}\2", endpoint)
+
+
+# --- hooks -------------------------------------------------------------------
+
+def add_request_hook(before=None, after=None):
+    """
+    Registers callables run around every HTTP attempt. Both receive an info
+    dict with "method", "endpoint" (templated) and "url"; after() also gets
+    "status" (None if the call failed to connect), "elapsed" (seconds) and
+    "error". Hooks must be fast and must not raise.
+    """
+    with _lock:
+        if before is not None:
+            _before_request_hooks.append(before)
+        if after is not None:
+            _after_request_hooks.append(after)
+
+
+def add_task_hook(hook):
+    """
+    Registers hook(event, task, info) for task lifecycle events:
+    "submitted", "running" (first poll the server no longer reports PENDING)
+    and "finished". info is task.stats().
+    """
+    with _lock:
+        _task_hooks.append(hook)
+
+
+def clear_hooks():
+    with _lock:
+        del _before_request_hooks[:]
+        del _after_request_hooks[:]
+        del _task_hooks[:]
+
+
+# --- recording (called by api_requestor and task) -----------------------------
+
+def request_started(method, endpoint, url):
+    """Returns the info dict to pass to request_finished()."""
+    info = {"method": method.upper(), "endpoint": endpoint_template(endpoint), "url": url}
+    for hook in _before_request_hooks:
+        hook(info)
+    info["_start"] = time.perf_counter()
+    return info
+
+
+def request_finished(info, status=None, error=None):
+    elapsed = time.perf_counter() - info.pop("_start")
+    key = (info["method"], info["endpoint"], status if status is not None else "error")
+    with _lock:
+        histogram = _request_metrics.get(key)
+        if histogram is None:
+            histogram = _request_metrics[key] = _Histogram()
+        histogram.observe(elapsed)
+    if _after_request_hooks:
+        info.update(status=status, elapsed=elapsed, error=error)
+        for hook in _after_request_hooks:
+            hook(info)
+
+
+def task_event(event, task):
+    if event == "finished":
+        stats = task.stats()
+        endpoint = endpoint_template(task.result_endpoint or "")
+        with _lock:
+            metrics = _task_metrics.get(endpoint)
+            if metrics is None:
+                metrics = _task_metrics[endpoint] = _TaskMetrics()
+            if stats["status"] == "SUCCESS":
+                metrics.succeeded += 1
+            else:
+                metrics.failed += 1
+            metrics.polls += stats["polls"]
+            if stats["duration"] is not None:
+                metrics.duration.observe(stats["duration"])
+            if stats["queued"] is not None:
+                metrics.queued.observe(stats["queued"])
+            if stats["wasted_wait"] is not None:
+                metrics.wasted.observe(stats["wasted_wait"])
+    if _task_hooks:
+        info = task.stats()
+        for hook in _task_hooks:
+            hook(event, task, info)
+
+
+# --- export ------------------------------------------------------------------
+
+def snapshot():
+    """
+    Returns all metrics as a plain dict:
+        {"requests": {"GET /x/ 200": {...histogram...}, ...},
+         "tasks": {"/x_result/{task_id}/": {...}, ...}}
+    """
+    with _lock:
+        requests_ = {
+            f"{method} {endpoint} {status}": h.as_dict()
+            for (method, endpoint, status), h in sorted(_request_metrics.items(), key=str)
+        }
+        tasks = {endpoint: m.as_dict() for endpoint, m in sorted(_task_metrics.items())}
+    return {"requests": requests_, "tasks": tasks}
+
+
+def _prometheus_histogram(lines, name, labels, histogram):
+    cumulative = 0
+    for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), histogram.counts):
+        cumulative += n
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+def prometheus_text():
+    """Returns all metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        lines.append("# HELP simile_request_seconds HTTP request latency.")
+        lines.append("# TYPE simile_request_seconds histogram")
+        for (method, endpoint, status), h in sorted(_request_metrics.items(), key=str):
+            labels = f'method="{method}",endpoint="{endpoint}",status="{status}"'
+            _prometheus_histogram(lines, "simile_request_seconds", labels, h)
+
+        for name, attr, help_ in (
+            ("simile_task_duration_seconds", "duration", "Task time from submission to completion."),
+            ("simile_task_queued_seconds", "queued", "Task time from submission until reported running."),
+            ("simile_task_wasted_wait_seconds", "wasted", "Time between the last pending poll and completion."),
+        ):
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} histogram")
+            for endpoint, m in sorted(_task_metrics.items()):
+                _prometheus_histogram(lines, name, f'endpoint="{endpoint}"', getattr(m, attr))
+
+        lines.append("# HELP simile_task_polls_total Result-endpoint polls by finished tasks.")
+        lines.append("# TYPE simile_task_polls_total counter")
+        for endpoint, m in sorted(_task_metrics.items()):
+            lines.append(f'simile_task_polls_total{{endpoint="{endpoint}"}} {m.polls}')
+        lines.append("# HELP simile_tasks_total Finished tasks by outcome.")
+        lines.append("# TYPE simile_tasks_total counter")
+        for endpoint, m in sorted(_task_metrics.items()):
+            lines.append(f'simile_tasks_total{{endpoint="{endpoint}",outcome="success"}} {m.succeeded}')
+            lines.append(f'simile_tasks_total{{endpoint="{endpoint}",outcome="failure"}} {m.failed}')
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Clears all recorded metrics (hooks stay registered)."""
+    with _lock:
+        _request_metrics.clear()
+        _task_metrics.clear()
@@ -0,0 +1,101 @@
+# simile/journal.py
+"""
+Optional durable journal of submitted server tasks.
+
+When enabled (simile.configure(journal="tasks.db")), every task submission is
+recorded with its endpoint and a fingerprint of the request. If the process dies
+while waiting, a rerun that submits the identical request reattaches to the
+still-running server task instead of starting (and paying for) a new one.
+Entries are dropped once their task finishes.
+"""
+
+import sqlite3
+import threading
+import time
+
+from .client import current_client
+from .utils import canonical_hash
+
+
+class TaskJournal:
+    """
+    SQLite-backed journal of in-flight tasks. Safe to share between threads,
+    and between processes pointing at the same file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " fingerprint TEXT PRIMARY KEY,"
+            " endpoint TEXT NOT NULL,"
+            " result_endpoint TEXT NOT NULL,"
+            " task_id TEXT NOT NULL,"
+            " submitted_at REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def fingerprint(endpoint, payload):
+        """Identifies a submission by API base, endpoint and canonical payload."""
+        return canonical_hash({"base": current_client().api_base, "endpoint": endpoint, "payload": payload})
+
+    def lookup(self, fingerprint):
+        """Returns (task_id, result_endpoint) of a pending task, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT task_id, result_endpoint FROM tasks WHERE fingerprint = ?",
+                (fingerprint,)
+            ).fetchone()
+        return row
+
+    def record(self, fingerprint, endpoint, result_endpoint, task_id):
+        """Records a newly submitted task."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, endpoint, result_endpoint, task_id, time.time())
+            )
+
+    def complete(self, fingerprint):
+        """Drops a task once it has finished (or can no longer be resumed)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE fingerprint = ?", (fingerprint,))
+
+    def pending(self):
+        """
+        Returns every journaled task that has not finished yet, oldest first, as
+        dicts with fingerprint, endpoint, result_endpoint, task_id and submitted_at.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fingerprint, endpoint, result_endpoint, task_id, submitted_at"
+                " FROM tasks ORDER BY submitted_at"
+            ).fetchall()
+        keys = ("fingerprint", "endpoint", "result_endpoint", "task_id", "submitted_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def pending_tasks(self):
+        """
+        Returns a Task for every pending entry so a restarted worker can reattach
+        to them directly, e.g. TaskGroup(journal.pending_tasks()).wait_all().
+        """
+        # Imported here to avoid a circular import (task imports journal)
+        from .task import Task
+
+        tasks = []
+        for entry in self.pending():
+            task = Task(entry["task_id"], entry["result_endpoint"])
+            task._journal_entry = (self, entry["fingerprint"])
+            tasks.append(task)
+        return tasks
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_journal():
+    """Returns the current client's TaskJournal, or None if journaling is off."""
+    return current_client().get_journal()
@@ -0,0 +1,479 @@
+# simile/mock_server.py
+"""
+Local mock of the Simile API for tests, load tests and benchmarks.
+
+Implements every endpoint the client calls, with server-side work modelled as
+Celery-style tasks (PENDING -> STARTED -> SUCCESS/FAILURE). Task latency,
+PENDING (queue) time, failure and HTTP error rates, and 429 throttling are
+all configurable:
+
+    from simile.mock_server import MockSimileServer, lognormal
+
+    with MockSimileServer(task_latency=lognormal(1.0, 0.5), max_requests_per_second=200) as server:
+        simile.configure(key="test", base=server.url)
+        ...
+
+MockSimileApp holds the endpoint logic without any networking, so it can
+also be driven in-process.
+"""
+
+import json
+import math
+import random
+import threading
+import time
+import uuid
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from .payload import compress, decompress
+from .utils import canonical_hash
+
+API_PREFIX = "/agents/api"
+
+# Responses at least this long are gzipped for clients that accept it
+COMPRESS_MIN_BYTES = 1024
+
+
+# --- latency distributions ---------------------------------------------------
+
+def constant(seconds):
+    """Always the same latency."""
+    return lambda rng: seconds
+
+
+def uniform(low, high):
+    """Latency drawn uniformly from [low, high]."""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median, sigma=0.5):
+    """Long-tailed latency with the given median (seconds)."""
+    mu = math.log(median) if median > 0 else 0.0
+    return lambda rng: rng.lognormvariate(mu, sigma) if median > 0 else 0.0
+
+
+def _as_distribution(value):
+    if callable(value):
+        return value
+    return constant(value or 0)
+
+
+class _MockTask:
+    def __init__(self, kind, started_at, finished_at, result_fn, error):
+        self.kind = kind
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.result_fn = result_fn  # run once, when the task is first seen finished
+        self.result = None
+        self.error = error
+
+
+class MockSimileApp:
+    """
+    The mock API itself: handle() maps one HTTP request to a response.
+
+    * task_latency: seconds a task runs once STARTED (number or distribution)
+    * queue_delay: seconds a task stays PENDING before it starts
+    * report_started: report STARTED while running (else PENDING until done)
+    * task_failure_rate: fraction of tasks that end in FAILURE
+    * http_error_rate: fraction of requests answered with a 503
+    * request_latency: server-side processing time per request
+    * max_requests_per_second / max_concurrent_requests: beyond these the
+      server answers 429 with a Retry-After header
+    * api_key: if set, other keys get a 401
+    * seed: seeds all randomness for reproducible runs
+    """
+    def __init__(
+        self,
+        task_latency=0.5,
+        queue_delay=0.0,
+        report_started=True,
+        task_failure_rate=0.0,
+        http_error_rate=0.0,
+        request_latency=0.0,
+        max_requests_per_second=None,
+        max_concurrent_requests=None,
+        retry_after=1,
+        api_key=None,
+        seed=None
+    ):
+        self.task_latency = _as_distribution(task_latency)
+        self.queue_delay = _as_distribution(queue_delay)
+        self.report_started = report_started
+        self.task_failure_rate = task_failure_rate
+        self.http_error_rate = http_error_rate
+        self.request_latency = _as_distribution(request_latency)
+        self.max_requests_per_second = max_requests_per_second
+        self.max_concurrent_requests = max_concurrent_requests
+        self.retry_after = retry_after
+        self.api_key = api_key
+
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._agents = {}
+        self._populations = {}
+        self._tasks = {}
+        self._active = 0
+        self._tokens = float(max_requests_per_second or 0)
+        self._refilled_at = time.monotonic()
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "request_bytes": 0, "by_endpoint": {}}
+
+        self._routes = {
+            ("POST", "/create_population/"): self._create_population,
+            ("GET", "/get_population_agents/"): self._get_population_agents,
+            ("POST", "/population_add_agent/"): self._population_add_agent,
+            ("DELETE", "/population_remove_agent/"): self._population_remove_agent,
+            ("DELETE", "/delete_population/"): self._delete_population,
+            ("POST", "/create_single_agent/"): self._create_single_agent,
+            ("GET", "/get_agent_details/"): self._get_agent_details,
+            ("POST", "/delete_agent/"): self._delete_agent,
+            ("POST", "/generate_agent_response/"): self._generate_agent_response,
+            ("POST", "/get_sub_population/"): self._get_sub_population,
+        }
+        self._result_routes = {
+            "create_single_agent_result",
+            "generate_agent_response_result",
+            "get_sub_population_result",
+        }
+
+    # --- helpers ---------------------------------------------------------
+
+    def _random(self):
+        with self._lock:
+            return self._rng.random()
+
+    def _draw(self, distribution):
+        with self._lock:
+            return max(distribution(self._rng), 0.0)
+
+    def _throttled(self):
+        """Token-bucket and concurrency checks; returns True if the request gets a 429."""
+        with self._lock:
+            if self.max_concurrent_requests is not None and self._active >= self.max_concurrent_requests:
+                return True
+            if self.max_requests_per_second:
+                now = time.monotonic()
+                rate = self.max_requests_per_second
+                self._tokens = min(rate, self._tokens + (now - self._refilled_at) * rate)
+                self._refilled_at = now
+                if self._tokens < 1:
+                    return True
+                self._tokens -= 1
+            self._active += 1
+            return False
+
+    def _start_task(self, kind, result_fn):
+        now = time.time()
+        started_at = now + self._draw(self.queue_delay)
+        finished_at = started_at + self._draw(self.task_latency)
+        failed = self._random() < self.task_failure_rate
+        task_id = uuid.uuid4().hex
+        task = _MockTask(
+            kind,
+            started_at,
+            finished_at,
+            None if failed else result_fn,
+            "Simulated task failure." if failed else None,
+        )
+        with self._lock:
+            self._tasks[task_id] = task
+        return 200, {"task_id": task_id}
+
+    @staticmethod
+    def _etag(value):
+        return '"' + canonical_hash(value)[:16] + '"'
+
+    # --- endpoints -------------------------------------------------------
+
+    def _create_population(self, query, body):
+        if not body.get("name"):
+            return 400, {"error": "name is required."}
+        population_id = "pop_" + uuid.uuid4().hex[:12]
+        with self._lock:
+            self._populations[population_id] = {"name": body["name"], "agent_ids": []}
+        return 200, {"status": "success", "population_id": population_id}
+
+    def _get_population_agents(self, query, body):
+        population_id = query.get("population_id")
+        with self._lock:
+            population = self._populations.get(population_id)
+            if population is None:
+                return 404, {"error": "Population not found."}
+            return 200, {"agent_ids": list(population["agent_ids"])}
+
+    def _population_add_agent(self, query, body):
+        with self._lock:
+            population = self._populations.get(body.get("population_id"))
+            if population is None:
+                return 404, {"error": "Population not found."}
+            if body.get("agent_id") not in self._agents:
+                return 404, {"error": "Agent not found."}
+            if body["agent_id"] not in population["agent_ids"]:
+                population["agent_ids"].append(body["agent_id"])
+        return 200, {"status": "success", "message": "Agent added."}
+
+    def _population_remove_agent(self, query, body):
+        with self._lock:
+            population = self._populations.get(body.get("population_id"))
+            if population is None:
+                return 404, {"error": "Population not found."}
+            if body.get("agent_id") in population["agent_ids"]:
+                population["agent_ids"].remove(body["agent_id"])
+        return 200, {"status": "success", "message": "Agent removed."}
+
+    def _delete_population(self, query, body):
+        with self._lock:
+            if self._populations.pop(body.get("population_id"), None) is None:
+                return 404, {"error": "Population not found."}
+        return 200, {"status": "success", "message": "Population deleted."}
+
+    def _create_single_agent(self, query, body):
+        for field in ("first_name", "last_name", "population_id"):
+            if not body.get(field):
+                return 400, {"error": f"{field} is required."}
+
+        def create():
+            agent_id = "agent_" + uuid.uuid4().hex[:12]
+            details = {k: v for k, v in body.items() if k != "agent_data"}
+            details["agent_id"] = agent_id
+            with self._lock:
+                self._agents[agent_id] = details
+                population = self._populations.get(body["population_id"])
+                if population is not None:
+                    population["agent_ids"].append(agent_id)
+            return {"agent_id": agent_id}
+
+        return self._start_task("create_single_agent", create)
+
+    def _get_agent_details(self, query, body):
+        with self._lock:
+            details = self._agents.get(query.get("agent_id"))
+        if details is None:
+            return 404, {"error": "Agent not found."}
+        return 200, dict(details)
+
+    def _delete_agent(self, query, body):
+        agent_id = body.get("agent_id")
+        with self._lock:
+            if self._agents.pop(agent_id, None) is None:
+                return 404, {"error": "Agent not found."}
+            for population in self._populations.values():
+                if agent_id in population["agent_ids"]:
+                    population["agent_ids"].remove(agent_id)
+        return 200, {"status": "success", "message": "Agent deleted."}
+
+    def _generate_agent_response(self, query, body):
+        question_type = body.get("question_type")
+        question = body.get("question") or {}
+
+        def generate():
+            with self._lock:
+                if question_type == "categorical" and question.get("options"):
+                    answer = self._rng.choice(question["options"])
+                elif question_type == "numerical":
+                    low, high = question.get("range", (0, 100))
+                    answer = self._rng.uniform(low, high)
+                else:
+                    answer = f"Mock answer from {body.get('agent_id')}."
+            return {"agent_id": body.get("agent_id"), "question_type": question_type, "answer": answer}
+
+        return self._start_task("generate_agent_response", generate)
+
+    def _get_sub_population(self, query, body):
+        n = int(body.get("n") or 1)
+
+        def sample():
+            with self._lock:
+                source = self._populations.get(body.get("population_id"))
+                pool = list(source["agent_ids"]) if source else list(self._agents)
+                chosen = self._rng.sample(pool, min(n, len(pool)))
+                population_id = "pop_" + uuid.uuid4().hex[:12]
+                self._populations[population_id] = {"name": "sub-population", "agent_ids": chosen}
+            return {"new_population_id": population_id}
+
+        return self._start_task("get_sub_population", sample)
+
+    def _task_result(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+        if task is None:
+            return 404, {"error": "Task not found."}
+        now = time.time()
+        if now < task.started_at:
+            return 200, {"status": "PENDING"}
+        if now < task.finished_at:
+            return 200, {"status": "STARTED" if self.report_started else "PENDING"}
+        if task.error is not None:
+            return 200, {"status": "FAILURE", "error": task.error}
+        with self._lock:
+            # Apply the task's side effect (e.g. creating the agent) exactly once
+            if task.result_fn is not None:
+                task.result = task.result_fn()
+                task.result_fn = None
+            return 200, {"status": "SUCCESS", "result": task.result}
+
+    # --- entry point -----------------------------------------------------
+
+    def handle(self, method, path, query=None, headers=None, body=b""):
+        """
+        Handles one request. path may include the API prefix and/or a query
+        string. Returns (status, headers, body_bytes).
+        """
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        split = urlsplit(path)
+        path = split.path
+        if path.startswith(API_PREFIX):
+            path = path[len(API_PREFIX):]
+        params = {k: v[0] for k, v in parse_qs(split.query).items()}
+        params.update(query or {})
+        method = method.upper()
+
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["request_bytes"] += len(body or b"")
+            by_endpoint = self.stats["by_endpoint"]
+            template = path
+            parts = path.strip("/").split("/")
+            if len(parts) == 2 and parts[0] in self._result_routes:
+                template = f"/{parts[0]}/{{task_id}}/"
+            by_endpoint[template] = by_endpoint.get(template, 0) + 1
+
+        if self.api_key is not None and headers.get("authorization") != f"Api-Key {self.api_key}":
+            return self._respond(401, {"error": "Invalid API key."})
+
+        if self._throttled():
+            with self._lock:
+                self.stats["throttled"] += 1
+            return self._respond(429, {"error": "Too many requests."}, {"Retry-After": str(self.retry_after)})
+
+        try:
+            delay = self._draw(self.request_latency)
+            if delay:
+                time.sleep(delay)
+            if self.http_error_rate and self._random() < self.http_error_rate:
+                with self._lock:
+                    self.stats["errors"] += 1
+                return self._respond(503, {"error": "Simulated server error."})
+
+            try:
+                if headers.get("content-encoding") in ("gzip", "deflate"):
+                    body = decompress(body)
+                data = json.loads(body) if body else {}
+            except (ValueError, zlib.error):
+                return self._respond(400, {"error": "Invalid JSON body."})
+
+            if len(parts) == 2 and parts[0] in self._result_routes and method == "GET":
+                status, payload = self._task_result(parts[1])
+            else:
+                route = self._routes.get((method, path))
+                if route is None:
+                    return self._respond(404, {"error": f"No route for {method} {path}."})
+                status, payload = route(params, data)
+
+            extra = {}
+            if method == "GET" and status == 200 and path in ("/get_population_agents/", "/get_agent_details/"):
+                etag = self._etag(payload)
+                if headers.get("if-none-match") == etag:
+                    return 304, {"ETag": etag}, b""
+                extra["ETag"] = etag
+            status, out, body = self._respond(status, payload, extra)
+            if len(body) >= COMPRESS_MIN_BYTES and "gzip" in headers.get("accept-encoding", ""):
+                out["Content-Encoding"] = "gzip"
+                body = compress(body, "gzip")
+            return status, out, body
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    @staticmethod
+    def _respond(status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        out = {"Content-Type": "application/json"}
+        out.update(headers or {})
+        return status, out, body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            # The client dropped a keep-alive connection (e.g. a cancelled hedge)
+            pass
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                # Skip any trailers up to the final blank line
+                while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def _dispatch(self):
+        body = self._read_body()
+        status, headers, payload = self.server.app.handle(
+            self.command, self.path, headers=dict(self.headers.items()), body=body
+        )
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on this request (e.g. a cancelled hedge)
+            self.close_connection = True
+
+    do_GET = do_POST = do_DELETE = do_PUT = _dispatch
+
+
+class MockSimileServer:
+    """
+    Serves a MockSimileApp over HTTP on localhost in a background thread.
+    Keyword arguments are passed to MockSimileApp unless an app is given.
+    """
+    def __init__(self, app=None, host="127.0.0.1", port=0, **app_options):
+        self.app = app or MockSimileApp(**app_options)
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.app = self.app
+        self._thread = None
+
+    @property
+    def url(self):
+        """API base URL to pass to simile.configure(base=...)."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,145 @@
+# simile/payload.py
+"""
+Request body encoding: compact JSON, optional gzip/deflate compression and
+streaming of large list values such as agent_data.
+
+With simile.configure(compression="gzip") (or "deflate"), bodies of at least
+config.compression_threshold bytes are sent compressed with a matching
+Content-Encoding header. Compressed responses are always accepted.
+
+A value wrapped in Stream, or a generator/iterator passed as agent_data, is
+serialized item by item while the request is being sent, so the whole JSON
+document is never built in memory:
+
+    from simile.utils import read_jsonl
+
+    Agent.create("Ada", "Lovelace", population_id=pid, agent_data=read_jsonl("transcript.jsonl"))
+
+Streamed bodies can only be sent once, so they are not retried and not
+recorded in the task journal.
+"""
+
+import json
+import zlib
+
+from .client import current_client
+
+# Streamed bodies are sent in chunks of about this many bytes
+CHUNK_SIZE = 64 * 1024
+
+# zlib wbits for each Content-Encoding ("deflate" is the zlib format in HTTP)
+COMPRESSION_WBITS = {"gzip": 31, "deflate": 15}
+
+# Accepts gzip, deflate and raw zlib data when decompressing
+_DECOMPRESS_WBITS = 47
+
+
+class Stream:
+    """A JSON array whose items come from an iterable, serialized lazily; can be sent once."""
+    def __init__(self, items):
+        self.items = items
+
+
+def is_streamed(payload):
+    """True if payload contains a Stream anywhere."""
+    if isinstance(payload, Stream):
+        return True
+    if isinstance(payload, dict):
+        return any(is_streamed(value) for value in payload.values())
+    if isinstance(payload, (list, tuple)):
+        return any(is_streamed(value) for value in payload)
+    return False
+
+
+def is_one_shot(body):
+    """True for bodies (generators/iterators) that can't be sent a second time."""
+    return hasattr(body, "__next__")
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def iter_json(payload):
+    """Yields the compact JSON text of payload in pieces, expanding Stream values lazily."""
+    if isinstance(payload, Stream):
+        yield "["
+        for index, item in enumerate(payload.items):
+            if index:
+                yield ","
+            yield _dumps(item)
+        yield "]"
+    elif isinstance(payload, dict) and is_streamed(payload):
+        yield "{"
+        for index, (key, value) in enumerate(payload.items()):
+            if index:
+                yield ","
+            yield _dumps(str(key)) + ":"
+            yield from iter_json(value)
+        yield "}"
+    elif isinstance(payload, (list, tuple)) and is_streamed(payload):
+        yield "["
+        for index, value in enumerate(payload):
+            if index:
+                yield ","
+            yield from iter_json(value)
+        yield "]"
+    else:
+        yield _dumps(payload)
+
+
+def _chunks(pieces):
+    """Groups text pieces into UTF-8 chunks of about CHUNK_SIZE bytes."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _compress_chunks(chunks, encoding):
+    compressor = zlib.compressobj(wbits=COMPRESSION_WBITS[encoding])
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def compress(data, encoding):
+    """Compresses bytes for the given Content-Encoding ("gzip" or "deflate")."""
+    compressor = zlib.compressobj(wbits=COMPRESSION_WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data):
+    """Decompresses a gzip or deflate body."""
+    return zlib.decompress(data, _DECOMPRESS_WBITS)
+
+
+def encode_json(payload):
+    """
+    Returns (body, headers) for a JSON payload. body is bytes, compressed once
+    it reaches the client's compression_threshold; for streamed payloads it is a
+    generator of chunks, compressed whenever compression is on (their size
+    isn't known up front). headers holds any Content-Encoding to add.
+    """
+    client = current_client()
+    encoding = client.compression
+    if is_streamed(payload):
+        body = _chunks(iter_json(payload))
+        if encoding:
+            return _compress_chunks(body, encoding), {"Content-Encoding": encoding}
+        return body, {}
+
+    body = _dumps(payload).encode("utf-8")
+    if encoding and len(body) >= client.compression_threshold:
+        return compress(body, encoding), {"Content-Encoding": encoding}
+    return body, {}
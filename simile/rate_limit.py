@@ -0,0 +1,236 @@
+# simile/rate_limit.py
+"""
+Process-wide client-side governor for API calls.
+
+Calls are grouped into endpoint classes:
+  * "submit":   POSTs that start a server task (agent creation, generation, sampling)
+  * "poll":     GETs of a task's *_result/<task_id>/ endpoint
+  * "metadata": everything else (details, membership, deletes, ...)
+
+Each class has its own limiter: an optional token-bucket rate limit plus a
+max-in-flight cap. Limits adapt to the server: a 429/503 halves the class's
+in-flight limit and rate (and pauses it for any Retry-After), and every
+success grows them back towards the configured values. Concurrency therefore
+settles near what the server can actually handle instead of oscillating
+into errors.
+
+Configure with, for example:
+    simile.configure(rate_limits={
+        "submit": {"rate": 20, "burst": 40, "max_in_flight": 64},
+        "poll": {"rate": 100},
+    })
+"""
+
+import asyncio
+import collections
+import threading
+import time
+
+from .client import current_client
+
+ENDPOINT_CLASSES = ("submit", "poll", "metadata")
+
+# Endpoints whose POST starts a server-side task
+SUBMIT_ENDPOINTS = (
+    "/create_single_agent/",
+    "/generate_agent_response/",
+    "/get_sub_population/",
+)
+
+# Responses that mean "slow down"
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def endpoint_class(method, endpoint):
+    """Returns "submit", "poll" or "metadata" for an API call."""
+    if "_result/" in endpoint:
+        return "poll"
+    if method.upper() == "POST" and endpoint in SUBMIT_ENDPOINTS:
+        return "submit"
+    return "metadata"
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket plus an adjustable max-in-flight cap, shared by threads and
+    event loops. Use acquire()/release() (or acquire_async()) around each call.
+
+    * rate: sustained calls per second (None for no rate limit)
+    * burst: bucket size, i.e. calls allowed back to back (default: max(rate, 1))
+    * max_in_flight: cap on concurrent calls (None for no cap; a cap learned
+      from throttling is dropped again once it has grown back to the
+      concurrency at which throttling started)
+
+    Threads wait on a condition variable; coroutines wait on a future that
+    release() resolves on their event loop, so idle waiters cost nothing.
+    """
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        self.max_rate = rate
+        self.burst = burst if burst is not None else max(rate or 1, 1)
+        self.max_in_flight = max_in_flight
+        self._rate = rate
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._limit = float(max_in_flight) if max_in_flight else None
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._throttled = 0
+        self._uncap_at = None  # without max_in_flight: limit at which the learned cap is dropped
+        self._cond = threading.Condition()
+        self._async_waiters = collections.deque()  # (event loop, future) waiting for a slot
+
+    def _refill(self, now):
+        if self._rate is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self._rate)
+        self._refilled_at = now
+
+    def _try_acquire(self):
+        """Takes a slot if possible. Returns 0 on success, else a suggested wait in seconds."""
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._limit is not None and self._in_flight >= int(self._limit):
+            return None  # wait for a release
+        self._refill(now)
+        if self._rate is not None and self._tokens < 1:
+            return (1 - self._tokens) / self._rate
+        if self._rate is not None:
+            self._tokens -= 1
+        self._in_flight += 1
+        return 0
+
+    def acquire(self):
+        """Blocks the calling thread until a call may be made."""
+        with self._cond:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return
+                self._cond.wait(wait)
+
+    async def acquire_async(self):
+        """Like acquire(), but waits without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return
+                if wait is None:
+                    # No free slot: release() resolves this future
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+            if wait is not None:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken but cancelled before taking the slot; pass the wakeup on
+                    with self._cond:
+                        self._wake_async(1)
+                raise
+
+    def _wake_async(self, count):
+        """Wakes up to count waiting coroutines. Called with self._cond held."""
+        while count > 0 and self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._resolve_waiter, waiter)
+            except RuntimeError:
+                continue  # its event loop is closed
+            count -= 1
+
+    def _resolve_waiter(self, waiter):
+        # Runs on the waiter's event loop
+        if waiter.done():
+            # Its coroutine was cancelled meanwhile; wake the next one instead
+            with self._cond:
+                self._wake_async(1)
+        else:
+            waiter.set_result(None)
+
+    def release(self, status_code=None, retry_after=None):
+        """
+        Frees the slot taken by acquire() and adapts the limits to the outcome:
+        status_code is the response status (None if the call failed to connect).
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if status_code in THROTTLE_STATUS_CODES:
+                self._throttle(retry_after)
+            elif status_code is not None and status_code < 500:
+                self._recover()
+            self._cond.notify_all()
+            if self._async_waiters:
+                if self._limit is None:
+                    self._wake_async(len(self._async_waiters))
+                else:
+                    self._wake_async(int(self._limit) - self._in_flight)
+
+    def _throttle(self, retry_after):
+        # Multiplicative decrease
+        self._throttled += 1
+        current = self._in_flight + 1
+        if self._limit is None:
+            self._uncap_at = current
+        self._limit = max(1.0, (self._limit if self._limit is not None else current) / 2)
+        if self._rate is not None:
+            self._rate = max(self._rate / 2, 0.1)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def _recover(self):
+        # Additive increase: roughly +1 in-flight slot per window of successes
+        if self._limit is not None:
+            self._limit += 1.0 / self._limit
+            if self.max_in_flight is not None:
+                self._limit = min(self._limit, float(self.max_in_flight))
+            elif self._uncap_at is not None and self._limit >= self._uncap_at:
+                self._limit = None
+        if self._rate is not None and self._rate < self.max_rate:
+            self._rate = min(self.max_rate, self._rate + self.max_rate * 0.05)
+
+    def pause(self, seconds):
+        """Blocks new calls of this class for the given number of seconds."""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "limit": int(self._limit) if self._limit is not None else None,
+                "rate": self._rate,
+                "throttled": self._throttled,
+            }
+
+
+class Governor:
+    """One AdaptiveLimiter per endpoint class."""
+    def __init__(self, limits=None):
+        limits = limits or {}
+        unknown = set(limits) - set(ENDPOINT_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown endpoint class(es): {', '.join(sorted(unknown))}.")
+        self.limiters = {
+            name: AdaptiveLimiter(**limits.get(name, {})) for name in ENDPOINT_CLASSES
+        }
+
+    def limiter(self, method, endpoint):
+        return self.limiters[endpoint_class(method, endpoint)]
+
+    def stats(self):
+        """Returns {endpoint_class: {"in_flight", "limit", "rate", "throttled"}}."""
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+def get_governor():
+    """Returns the current client's Governor, built from its rate_limits."""
+    return current_client().get_governor()
+
+
+def reset_governor():
+    """Drops the current client's Governor so the next call rebuilds it from its settings."""
+    current_client().reset_governor()
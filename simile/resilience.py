@@ -0,0 +1,401 @@
+# simile/resilience.py
+"""
+Tail-latency and failure protection for API calls: hedged GETs and
+per-endpoint circuit breakers. Both are off by default.
+
+Hedging: when a GET (a task poll, agent details, population members) has no
+response after the latency quantile recently observed for its endpoint (p95 by
+default), one identical request is sent alongside it and whichever answers
+first is used. At most max_ratio of an endpoint's requests are hedged, so
+hedges can't double the load on a slow server:
+
+    simile.configure(hedging={"quantile": 0.95, "min_samples": 20, "max_ratio": 0.1})
+
+Circuit breaker: after failure_threshold consecutive failures (connection
+errors, timeouts or 5xx responses) on one endpoint, calls to it fail
+immediately with error.CircuitOpenError for reset_timeout seconds. Then a
+single trial call is let through; its outcome closes the circuit or opens it
+again:
+
+    simile.configure(circuit_breaker={"failure_threshold": 5, "reset_timeout": 30})
+
+Endpoints are keyed by template (task ids replaced), so all polls of one
+result endpoint share a breaker and a latency window. Inspect the state with
+resilience.stats().
+"""
+
+import asyncio
+import collections
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .client import current_client
+from .error import CircuitOpenError
+from .instrumentation import endpoint_template
+
+HEDGING_DEFAULTS = {
+    "quantile": 0.95,    # hedge after this latency quantile of the endpoint
+    "min_samples": 20,   # no hedging until this many latencies were observed
+    "min_delay": 0.01,   # never hedge sooner than this (seconds)
+    "max_ratio": 0.1,    # at most this fraction of an endpoint's requests are hedged
+    "window": 200,       # latencies kept per endpoint
+}
+
+CIRCUIT_BREAKER_DEFAULTS = {
+    "failure_threshold": 5,  # consecutive failures that open the circuit
+    "reset_timeout": 30,     # seconds the circuit stays open before a trial call
+}
+
+
+def _settings(value, defaults, name):
+    """Merges a hedging/circuit_breaker setting with its defaults; None if off."""
+    if not value:
+        return None
+    if value is True:
+        return dict(defaults)
+    unknown = set(value) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown {name} setting(s): {', '.join(sorted(unknown))}.")
+    return {**defaults, **value}
+
+
+class LatencyWindow:
+    """The most recent latencies of one endpoint."""
+    def __init__(self, size):
+        self._latencies = collections.deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._latencies)
+
+    def add(self, seconds):
+        self._latencies.append(seconds)
+
+    def quantile(self, q):
+        if not self._latencies:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures; open ->
+    half-open after reset_timeout seconds, letting one trial call through;
+    the trial's success closes it, its failure opens it again.
+
+    before_call() returns a ticket that the call's outcome is recorded with.
+    Every transition to open or closed starts a new epoch, and outcomes of
+    calls from an earlier epoch are ignored: a slow call started before the
+    circuit opened can't close it, and only the trial resolves half-open.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, endpoint, failure_threshold=5, reset_timeout=30):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._epoch = 0
+        self._trial_in_flight = False
+        self._opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._state
+
+    def _expire(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+
+    def _transition(self, state):
+        self._state = state
+        self._epoch += 1
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+            self._opened += 1
+        else:
+            self._failures = 0
+
+    def before_call(self):
+        """
+        Returns the ticket to record the call's outcome with, or raises
+        CircuitOpenError if the call must not be made now.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if self._state == self.CLOSED:
+                return (self._epoch, False)
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return (self._epoch, True)
+            self._rejected += 1
+            retry_after = max(self._opened_at + self.reset_timeout - now, 0)
+            message = (
+                f"Circuit open for {self.endpoint} after {self._failures} consecutive failures; "
+                f"retry in {retry_after:.1f}s."
+            )
+        raise CircuitOpenError(message, retry_after=retry_after)
+
+    def record(self, ticket, ok):
+        """
+        Records the outcome of the call that got ticket from before_call():
+        True, False, or None (no verdict, e.g. cancelled).
+        """
+        epoch, trial = ticket
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            if trial:
+                self._trial_in_flight = False
+                if ok is not None:
+                    self._transition(self.CLOSED if ok else self.OPEN)
+                return
+            if ok is None or self._state != self.CLOSED:
+                return
+            if ok:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._transition(self.OPEN)
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "state": self._state,
+                "failures": self._failures,
+                "opened": self._opened,
+                "rejected": self._rejected,
+            }
+
+
+class _EndpointStats:
+    def __init__(self, window):
+        self.latencies = LatencyWindow(window)
+        self.requests = 0
+        self.hedged = 0
+        self.hedges_won = 0
+
+
+class Resilience:
+    """
+    A client's hedging and circuit-breaker state: one breaker and one latency
+    window per endpoint template. hedging and circuit_breaker are dicts of
+    settings (see HEDGING_DEFAULTS, CIRCUIT_BREAKER_DEFAULTS), True for the
+    defaults, or None/False for off.
+    """
+    def __init__(self, hedging=None, circuit_breaker=None, max_workers=32):
+        self.hedging = _settings(hedging, HEDGING_DEFAULTS, "hedging")
+        self.circuit_breaker = _settings(circuit_breaker, CIRCUIT_BREAKER_DEFAULTS, "circuit_breaker")
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._endpoints = {}
+        self._executor = None
+
+    @property
+    def enabled(self):
+        return self.hedging is not None or self.circuit_breaker is not None
+
+    def breaker(self, endpoint):
+        """The CircuitBreaker of an endpoint, or None if circuit breaking is off."""
+        if self.circuit_breaker is None:
+            return None
+        key = endpoint_template(endpoint)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(key, CircuitBreaker(key, **self.circuit_breaker))
+        return breaker
+
+    def _endpoint(self, endpoint):
+        key = endpoint_template(endpoint)
+        stats = self._endpoints.get(key)
+        if stats is None:
+            window = self.hedging["window"] if self.hedging else HEDGING_DEFAULTS["window"]
+            with self._lock:
+                stats = self._endpoints.setdefault(key, _EndpointStats(window))
+        return stats
+
+    def before_call(self, endpoint):
+        """
+        Fails fast if the endpoint's circuit is open. Returns the breaker
+        ticket to pass to record() (None if circuit breaking is off).
+        """
+        breaker = self.breaker(endpoint)
+        if breaker is not None:
+            return breaker.before_call()
+        return None
+
+    def record(self, endpoint, ticket, status, error, elapsed):
+        """
+        Records one HTTP attempt made with ticket. status is None if it failed
+        (error set) or was cancelled (error None), which gives the breaker no
+        verdict.
+        """
+        if status is None:
+            ok = False if error is not None else None
+        else:
+            ok = status < 500
+        breaker = self.breaker(endpoint)
+        if breaker is not None and ticket is not None:
+            breaker.record(ticket, ok)
+        if ok and self.hedging is not None:
+            stats = self._endpoint(endpoint)
+            with self._lock:
+                stats.latencies.add(elapsed)
+
+    def hedge_delay(self, method, endpoint):
+        """
+        Seconds to wait before hedging this call, or None to not hedge it
+        (hedging off, not a GET, too few samples, over budget, circuit not
+        closed). The budget is checked again when the hedge is due (see
+        _reserve_hedge), since concurrent calls all pass this check.
+        """
+        if self.hedging is None or method.upper() != "GET":
+            return None
+        breaker = self.breaker(endpoint)
+        if breaker is not None and breaker.state != CircuitBreaker.CLOSED:
+            return None
+        stats = self._endpoint(endpoint)
+        with self._lock:
+            stats.requests += 1
+            if len(stats.latencies) < self.hedging["min_samples"]:
+                return None
+            if stats.hedged + 1 > self.hedging["max_ratio"] * stats.requests:
+                return None
+            delay = stats.latencies.quantile(self.hedging["quantile"])
+        return max(delay, self.hedging["min_delay"])
+
+    def _reserve_hedge(self, endpoint):
+        """Counts a hedge about to be sent; False if that would exceed max_ratio."""
+        stats = self._endpoint(endpoint)
+        with self._lock:
+            if stats.hedged + 1 > self.hedging["max_ratio"] * stats.requests:
+                return False
+            stats.hedged += 1
+            return True
+
+    def _hedge_won(self, endpoint):
+        stats = self._endpoint(endpoint)
+        with self._lock:
+            stats.hedges_won += 1
+
+    def _get_executor(self):
+        executor = self._executor
+        if executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="simile-hedge"
+                    )
+                executor = self._executor
+        return executor
+
+    def call(self, endpoint, delay, send):
+        """
+        Calls send() from a worker thread; if it hasn't returned after delay
+        seconds, calls it a second time (budget permitting) and returns
+        whichever succeeds first. The slower call is left to finish in the
+        background. send must carry its own client context (e.g.
+        functools.partial(client.run, fn)) and accept a started callback, which
+        it calls once the request is about to go out: the delay is counted
+        from then, so time queued for a worker or a limiter slot doesn't
+        trigger hedges.
+        """
+        executor = self._get_executor()
+        started = threading.Event()
+        first = executor.submit(send, started=started.set)
+        first.add_done_callback(lambda future: started.set())
+        started.wait()
+        done, _ = wait([first], timeout=delay)
+        if done or not self._reserve_hedge(endpoint):
+            return first.result()
+
+        second = executor.submit(send)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._hedge_won(endpoint)
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def call_async(self, endpoint, delay, send):
+        """Async version of call(); send() returns a coroutine. The slower call is cancelled."""
+        started = asyncio.Event()
+        tasks = [asyncio.ensure_future(send(started=started.set))]
+        tasks[0].add_done_callback(lambda task: started.set())
+        try:
+            await started.wait()
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._reserve_hedge(endpoint):
+                return await tasks[0]
+
+            tasks.append(asyncio.ensure_future(send()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self._hedge_won(endpoint)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self):
+        """
+        Returns {endpoint: {...}} with the breaker's "state", "failures",
+        "opened" and "rejected", and the hedging "requests", "hedged",
+        "hedges_won" and current hedge "delay" (the observed quantile).
+        """
+        result = {}
+        for key, breaker in list(self._breakers.items()):
+            result[key] = breaker.stats()
+        if self.hedging is not None:
+            with self._lock:
+                for key, stats in self._endpoints.items():
+                    result.setdefault(key, {}).update(
+                        requests=stats.requests,
+                        hedged=stats.hedged,
+                        hedges_won=stats.hedges_won,
+                        delay=stats.latencies.quantile(self.hedging["quantile"]),
+                    )
+        return result
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def get_resilience():
+    """Returns the current client's Resilience state."""
+    return current_client().get_resilience()
+
+
+def stats():
+    """Hedging and circuit-breaker state of the current client, per endpoint."""
+    return get_resilience().stats()
@@ -4,9 +4,144 @@ Implements Agent-related methods.
 We now hide async calls by automatically waiting on tasks.
 """
 
+import asyncio
+import io
+import threading
+
+from .client import current_client
 from .api_requestor import request
-from .task import Task
+from .async_api_requestor import request as arequest
+from .task import Task, AsyncTask, run_tasks
+from .utils import Checkpoint
+from .cache import (
+    response_cache_key,
+    agent_key,
+    cached_get,
+    async_cached_get,
+    invalidate_agent,
+    invalidate_population,
+)
 from .error import RequestError
+from .payload import Stream
+
+# The result endpoints are /<submit endpoint>_result/<task_id>/
+CREATE_RESULT_ENDPOINT = "/create_single_agent_result/{task_id}/"
+RESPONSE_RESULT_ENDPOINT = "/generate_agent_response_result/{task_id}/"
+
+_MISS = object()  # cache-miss sentinel (None can be a valid cached response)
+
+
+def _create_payload(
+    first_name,
+    last_name,
+    forked_agent_id,
+    speech_pattern,
+    self_description,
+    population_id,
+    read_permission,
+    write_permission,
+    agent_data
+):
+    """Validates Agent.create arguments and builds the request payload."""
+    # Validate required fields
+    if not first_name:
+        raise ValueError("first_name is required.")
+    if not last_name:
+        raise ValueError("last_name is required.")
+    if not population_id:
+        raise ValueError("population_id is required.")
+    if not read_permission:
+        raise ValueError("read_permission is required.")
+    if not write_permission:
+        raise ValueError("write_permission is required.")
+
+    if agent_data is None:
+        agent_data = []
+    elif isinstance(agent_data, io.IOBase):
+        # Iterating a file gives raw lines, which would be sent as strings
+        raise TypeError(
+            "agent_data must be records, not a file; use simile.utils.read_jsonl(path) to stream a JSONL file."
+        )
+    elif hasattr(agent_data, "__next__"):
+        # Generators/iterators (e.g. utils.read_jsonl) are streamed, not loaded
+        agent_data = Stream(agent_data)
+
+    return {
+        "first_name": first_name,
+        "last_name": last_name,
+        "forked_agent_id": forked_agent_id,
+        "speech_pattern": speech_pattern,
+        "self_description": self_description,
+        "population_id": population_id,
+        "read_permission": read_permission,
+        "write_permission": write_permission,
+        "agent_data": agent_data
+    }
+
+
+_CREATE_DEFAULTS = {
+    "forked_agent_id": "",
+    "speech_pattern": "",
+    "self_description": "",
+    "population_id": None,
+    "read_permission": "private",
+    "write_permission": "private",
+    "agent_data": None,
+}
+
+
+def _record_payload(record, population_id):
+    """
+    Builds a create payload from one create_many record (a dict of Agent.create
+    arguments), falling back to the batch's population_id.
+    """
+    unknown = set(record) - set(_CREATE_DEFAULTS) - {"first_name", "last_name"}
+    if unknown:
+        raise ValueError(f"Unknown agent field(s): {', '.join(sorted(unknown))}.")
+    fields = dict(_CREATE_DEFAULTS, population_id=population_id)
+    fields.update(record)
+    return _create_payload(
+        fields.get("first_name"), fields.get("last_name"), fields["forked_agent_id"],
+        fields["speech_pattern"], fields["self_description"], fields["population_id"],
+        fields["read_permission"], fields["write_permission"], fields["agent_data"]
+    )
+
+
+def _pending_records(records, checkpoint):
+    """Yields (index, record) for every record not already in the checkpoint."""
+    for index, record in enumerate(records):
+        if checkpoint is None or index not in checkpoint:
+            yield index, record
+
+
+def _agent_id_from_result(final_data):
+    agent_id = final_data.get("agent_id")
+    if not agent_id:
+        raise RequestError("No 'agent_id' returned in final result.")
+    return agent_id
+
+
+def _cached_response(agent_id, question_type, question_payload, use_cache, refresh):
+    """
+    Returns (cache, key, cached value or _MISS). cache is None when caching is
+    off or bypassed for this call, so there is nothing to store afterwards.
+    """
+    cache = current_client().response_cache
+    if cache is None or not use_cache:
+        return None, None, _MISS
+    key = response_cache_key(agent_id, question_type, question_payload)
+    if refresh:
+        return cache, key, _MISS
+    return cache, key, cache.get(key, _MISS)
+
+
+def _response_payload(agent_id, question_type, question_payload):
+    return {
+        "agent_id": agent_id,
+        "question_type": question_type,
+        "question": question_payload
+    }
+
 
 class Agent:
     @staticmethod
@@ -29,6 +164,8 @@ class Agent:
         * population_id (required)
         * read_permission (default: 'private')
         * write_permission (default: 'private')
+        * agent_data: a list of records, or a generator/iterator such as
+          simile.utils.read_jsonl(path), which is streamed instead of loaded
         
         This function will not return until the creation is fully done server-side.
         
@@ -39,61 +176,90 @@ class Agent:
             ValueError if required fields are missing.
             RequestError if the server returns an error.
         """
-        # Validate required fields
-        if not first_name:
-            raise ValueError("first_name is required.")
-        if not last_name:
-            raise ValueError("last_name is required.")
-        if not population_id:
-            raise ValueError("population_id is required.")
-        if not read_permission:
-            raise ValueError("read_permission is required.")
-        if not write_permission:
-            raise ValueError("write_permission is required.")
-
-        if agent_data is None:
-            agent_data = []
-
-        payload = {
-            "first_name": first_name,
-            "last_name": last_name,
-            "forked_agent_id": forked_agent_id,
-            "speech_pattern": speech_pattern,
-            "self_description": self_description,
-            "population_id": population_id,
-            "read_permission": read_permission,
-            "write_permission": write_permission,
-            "agent_data": agent_data
-        }
-
-        # Kick off the creation, which returns a task
-        resp = request("POST", "/create_single_agent/", json=payload)
-        data = resp.json()
-        task_id = data.get("task_id")
-        if not task_id:
-            raise RequestError("No 'task_id' returned from create_single_agent endpoint.")
-
-        # The result endpoint is /create_single_agent_result/<task_id>/
-        result_endpoint = "/create_single_agent_result/{task_id}/"
-
-        # Wait for the task to finish
-        final_data = Task(task_id, result_endpoint).wait()
-        agent_id = final_data.get("agent_id")
-
-        if not agent_id:
-            raise RequestError("No 'agent_id' returned in final result.")
-
-        return agent_id
+        payload = _create_payload(
+            first_name, last_name, forked_agent_id, speech_pattern, self_description,
+            population_id, read_permission, write_permission, agent_data
+        )
+
+        # Kick off the creation, which returns a task, and wait for it to finish
+        try:
+            task = Task.submit("/create_single_agent/", payload, CREATE_RESULT_ENDPOINT)
+            return _agent_id_from_result(task.wait())
+        finally:
+            invalidate_population(population_id)
+
+    @staticmethod
+    def create_many(records, population_id=None, concurrency=32, checkpoint=None, timeout=300):
+        """
+        Creates many agents concurrently.
+
+        records is any iterable of dicts with Agent.create arguments, e.g. a list
+        or a streaming reader such as simile.utils.read_jsonl(path) / read_csv(path).
+        population_id is used for records that don't set their own.
+
+        Every record is validated client-side; valid ones are submitted with at
+        most `concurrency` creations in flight and waited on together. This is a
+        generator yielding (input_index, agent_id_or_error) as each one finishes;
+        an invalid or failed record yields its exception instead of aborting.
+
+        checkpoint is an optional file path: successful creations are recorded
+        there, and records that already succeeded are skipped on a rerun.
+
+        Usage:
+            for index, agent_id in Agent.create_many(read_jsonl("agents.jsonl"), pid,
+                                                     checkpoint="agents.ckpt"):
+                if isinstance(agent_id, Exception):
+                    ...
+        """
+        done = Checkpoint(checkpoint) if checkpoint else None
+        touched = set()
+        target = {}  # input index -> population id, until the record finishes
+        lock = threading.Lock()  # submit() runs on the task group's threads
+
+        def submit(item):
+            index, record = item
+            payload = _record_payload(record, population_id)
+            with lock:
+                touched.add(payload["population_id"])
+                target[index] = payload["population_id"]
+            return Task.submit("/create_single_agent/", payload, CREATE_RESULT_ENDPOINT)
+
+        try:
+            for (index, _), outcome in run_tasks(
+                _pending_records(records, done), submit, concurrency=concurrency, timeout=timeout
+            ):
+                with lock:
+                    pid = target.pop(index, None)
+                if not isinstance(outcome, Exception):
+                    try:
+                        outcome = _agent_id_from_result(outcome)
+                    except RequestError as e:
+                        outcome = e
+                    else:
+                        if done is not None:
+                            done.add(index, outcome)
+                        # Only this record's population gained a member
+                        invalidate_population(pid)
+                yield index, outcome
+        finally:
+            with lock:
+                populations = list(touched)
+            for pid in populations:
+                invalidate_population(pid)
+            if done is not None:
+                done.close()
 
     @staticmethod
-    def retrieve_details(agent_id):
+    def retrieve_details(agent_id, refresh=False):
         """
         Synchronously retrieve agent details via GET /get_agent_details/.
         Returns a dict with details or raises RequestError on failure.
+
+        Served from the metadata cache when one is configured; pass
+        refresh=True to force a fresh read.
         """
         params = {"agent_id": agent_id}
-        resp = request("GET", "/get_agent_details/", params=params)
-        return resp.json()
+        return cached_get(agent_key(agent_id), "/get_agent_details/", params, refresh=refresh)
 
     @staticmethod
     def delete(agent_id):
@@ -102,34 +268,173 @@ class Agent:
         Returns a dict with {status, message} or raises RequestError.
         """
         payload = {"agent_id": agent_id}
-        resp = request("POST", "/delete_agent/", json=payload)
+        try:
+            resp = request("POST", "/delete_agent/", json=payload)
+        finally:
+            invalidate_agent(agent_id, deleted=True)
         return resp.json()
 
     @staticmethod
-    def generate_response(agent_id, question_type, question_payload):
+    def generate_response(agent_id, question_type, question_payload, use_cache=True, refresh=False):
         """
         Generates an agent's response (blocking call).
         
         question_type can be 'categorical', 'numerical', or 'chat'.
         question_payload is a dict, e.g. { "question": "...", "options": [...] }
+
+        If a response cache is configured (simile.configure(response_cache=...)),
+        repeated identical questions are answered from it:
+          * use_cache=False bypasses the cache entirely for this call
+          * refresh=True skips the cached answer but stores the new one
+
+        With simile.configure(coalesce_responses=True), identical concurrent
+        calls share one server task and all receive its answer.
         
         Returns:
             The final result from the server once the async task completes.
         """
-        payload = {
-            "agent_id": agent_id,
-            "question_type": question_type,
-            "question": question_payload
-        }
-        resp = request("POST", "/generate_agent_response/", json=payload)
-        data = resp.json()
-        task_id = data.get("task_id")
-        if not task_id:
-            raise RequestError("No 'task_id' returned from generate_agent_response endpoint.")
-
-        # The result endpoint is /generate_agent_response_result/<task_id>/
-        result_endpoint = "/generate_agent_response_result/{task_id}/"
-
-        # Wait and return final data
-        final_data = Task(task_id, result_endpoint).wait()
-        return final_data
+        cache, key, cached = _cached_response(agent_id, question_type, question_payload, use_cache, refresh)
+        if cached is not _MISS:
+            return cached
+
+        def generate():
+            # Wait and return final data
+            final_data = Agent.submit_response(agent_id, question_type, question_payload).wait()
+            if cache is not None:
+                cache.set(key, final_data)
+            return final_data
+
+        client = current_client()
+        if not client.coalesce_responses:
+            return generate()
+        flight_key = key or response_cache_key(agent_id, question_type, question_payload)
+        return client.responses.do(flight_key, generate)
+
+    @staticmethod
+    def submit_response(agent_id, question_type, question_payload):
+        """
+        Non-blocking version of generate_response: starts the server-side
+        generation and returns its Task without waiting on it.
+        """
+        payload = _response_payload(agent_id, question_type, question_payload)
+        return Task.submit("/generate_agent_response/", payload, RESPONSE_RESULT_ENDPOINT)
+
+
+class AsyncAgent:
+    """
+    asyncio version of Agent. Same arguments, validation and results, but every
+    method is a coroutine and task polling never blocks the event loop.
+    Requires aiohttp (pip install simile[async]).
+    """
+    @staticmethod
+    async def create(
+        first_name,
+        last_name,
+        forked_agent_id="",
+        speech_pattern="",
+        self_description="",
+        population_id=None,
+        read_permission="private",
+        write_permission="private",
+        agent_data=None
+    ):
+        """Async version of Agent.create. Returns the new agent's ID."""
+        payload = _create_payload(
+            first_name, last_name, forked_agent_id, speech_pattern, self_description,
+            population_id, read_permission, write_permission, agent_data
+        )
+        try:
+            task = await AsyncTask.submit("/create_single_agent/", payload, CREATE_RESULT_ENDPOINT)
+            return _agent_id_from_result(await task.wait())
+        finally:
+            invalidate_population(population_id)
+
+    @staticmethod
+    async def create_many(records, population_id=None, concurrency=256, checkpoint=None, timeout=300):
+        """
+        Async version of Agent.create_many: an async generator yielding
+        (input_index, agent_id_or_error) as each creation finishes.
+        """
+        done = Checkpoint(checkpoint) if checkpoint else None
+        pending = _pending_records(records, done)
+        touched = set()
+        target = {}  # input index -> population id, until the record finishes
+
+        async def create(index, record):
+            try:
+                payload = _record_payload(record, population_id)
+                touched.add(payload["population_id"])
+                target[index] = payload["population_id"]
+                task = await AsyncTask.submit("/create_single_agent/", payload, CREATE_RESULT_ENDPOINT)
+                return index, _agent_id_from_result(await task.wait(timeout=timeout))
+            except Exception as e:
+                return index, e
+
+        in_flight = set()
+        try:
+            while True:
+                for index, record in pending:
+                    in_flight.add(asyncio.ensure_future(create(index, record)))
+                    if len(in_flight) >= concurrency:
+                        break
+                if not in_flight:
+                    break
+                finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in finished:
+                    index, outcome = future.result()
+                    pid = target.pop(index, None)
+                    if not isinstance(outcome, Exception):
+                        if done is not None:
+                            done.add(index, outcome)
+                        # Only this record's population gained a member
+                        invalidate_population(pid)
+                    yield index, outcome
+        finally:
+            for future in in_flight:
+                future.cancel()
+            for pid in touched:
+                invalidate_population(pid)
+            if done is not None:
+                done.close()
+
+    @staticmethod
+    async def retrieve_details(agent_id, refresh=False):
+        """Async version of Agent.retrieve_details."""
+        params = {"agent_id": agent_id}
+        return await async_cached_get(agent_key(agent_id), "/get_agent_details/", params, refresh=refresh)
+
+    @staticmethod
+    async def delete(agent_id):
+        """Async version of Agent.delete."""
+        payload = {"agent_id": agent_id}
+        try:
+            resp = await arequest("POST", "/delete_agent/", json=payload)
+        finally:
+            invalidate_agent(agent_id, deleted=True)
+        return resp.json()
+
+    @staticmethod
+    async def generate_response(agent_id, question_type, question_payload, use_cache=True, refresh=False):
+        """Async version of Agent.generate_response."""
+        cache, key, cached = _cached_response(agent_id, question_type, question_payload, use_cache, refresh)
+        if cached is not _MISS:
+            return cached
+
+        async def generate():
+            task = await AsyncAgent.submit_response(agent_id, question_type, question_payload)
+            final_data = await task.wait()
+            if cache is not None:
+                cache.set(key, final_data)
+            return final_data
+
+        client = current_client()
+        if not client.coalesce_responses:
+            return await generate()
+        flight_key = key or response_cache_key(agent_id, question_type, question_payload)
+        return await client.responses.do_async(flight_key, generate)
+
+    @staticmethod
+    async def submit_response(agent_id, question_type, question_payload):
+        """Async version of Agent.submit_response. Returns an AsyncTask."""
+        payload = _response_payload(agent_id, question_type, question_payload)
+        return await AsyncTask.submit("/generate_agent_response/", payload, RESPONSE_RESULT_ENDPOINT)
@@ -4,9 +4,82 @@ Implements Population-related methods.
 Some are synchronous; get_sub_population is async but we now hide the wait.
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from .api_requestor import request
-from .task import Task
-from .error import RequestError
+from .async_api_requestor import request as arequest
+from .cache import (
+    population_key,
+    cached_get,
+    async_cached_get,
+    invalidate_agent,
+    invalidate_population,
+)
+from .client import current_client
+from .task import Task, AsyncTask, run_tasks
+from .resource_agent import Agent, AsyncAgent
+
+# The result endpoint is /get_sub_population_result/<task_id>/
+SUB_POPULATION_RESULT_ENDPOINT = "/get_sub_population_result/{task_id}/"
+
+
+def _create_payload(name, read_permission, write_permission, readme):
+    """Validates Population.create arguments and builds the request payload."""
+    if not name:
+        raise ValueError("name is required.")
+    if not read_permission:
+        raise ValueError("read_permission is required.")
+    if not write_permission:
+        raise ValueError("write_permission is required.")
+
+    return {
+        "name": name,
+        "read_permission": read_permission,
+        "write_permission": write_permission,
+        "readme": readme
+    }
+
+
+def _membership_payload(population_id, agent_id):
+    return {
+        "population_id": population_id,
+        "agent_id": agent_id
+    }
+
+
+def _membership_changed(population_id, agent_id):
+    """Evicts cached metadata affected by adding/removing an agent."""
+    invalidate_population(population_id)
+    invalidate_agent(agent_id)
+
+
+def _sync_plan(population_id, current_ids, desired_agent_ids, dry_run):
+    """Diffs current and desired membership into a Population.sync summary."""
+    current = set(current_ids)
+    desired = set(desired_agent_ids)
+    return {
+        "population_id": population_id,
+        "dry_run": dry_run,
+        "added": sorted(desired - current),
+        "removed": sorted(current - desired),
+        "unchanged": len(current & desired),
+        "errors": [],
+    }
+
+
+def _sync_finish(summary, outcomes):
+    """Moves failed changes from added/removed into errors."""
+    failed = set()
+    for operation, agent_id, error in outcomes:
+        if error is not None:
+            summary["errors"].append((operation, agent_id, error))
+            failed.add((operation, agent_id))
+    if failed:
+        summary["added"] = [a for a in summary["added"] if ("add", a) not in failed]
+        summary["removed"] = [a for a in summary["removed"] if ("remove", a) not in failed]
+    return summary
+
 
 class Population:
     @staticmethod
@@ -28,31 +101,21 @@ class Population:
             }
         or raises an error.
         """
-        if not name:
-            raise ValueError("name is required.")
-        if not read_permission:
-            raise ValueError("read_permission is required.")
-        if not write_permission:
-            raise ValueError("write_permission is required.")
-
-        payload = {
-            "name": name,
-            "read_permission": read_permission,
-            "write_permission": write_permission,
-            "readme": readme
-        }
+        payload = _create_payload(name, read_permission, write_permission, readme)
         resp = request("POST", "/create_population/", json=payload)
         return resp.json()
 
     @staticmethod
-    def get_agents(population_id):
+    def get_agents(population_id, refresh=False):
         """
         Synchronously get the agents in a population via GET /get_population_agents/.
         Returns { "agent_ids": [ ... ] }
+
+        Served from the metadata cache when one is configured; pass
+        refresh=True to force a fresh read.
         """
         params = {"population_id": population_id}
-        resp = request("GET", "/get_population_agents/", params=params)
-        return resp.json()
+        return cached_get(population_key(population_id), "/get_population_agents/", params, refresh=refresh)
 
     @staticmethod
     def add_agent(population_id, agent_id):
@@ -60,11 +123,11 @@ class Population:
         Synchronously add an agent to a population via POST /population_add_agent/.
         Returns { "status": "...", "message": "..." } or raises an error.
         """
-        payload = {
-            "population_id": population_id,
-            "agent_id": agent_id
-        }
-        resp = request("POST", "/population_add_agent/", json=payload)
+        payload = _membership_payload(population_id, agent_id)
+        try:
+            resp = request("POST", "/population_add_agent/", json=payload)
+        finally:
+            _membership_changed(population_id, agent_id)
         return resp.json()
 
     @staticmethod
@@ -73,11 +136,11 @@ class Population:
         Synchronously remove an agent from a population via DELETE /population_remove_agent/.
         Returns { "status": "...", "message": "..." } or raises an error.
         """
-        payload = {
-            "population_id": population_id,
-            "agent_id": agent_id
-        }
-        resp = request("DELETE", "/population_remove_agent/", json=payload)
+        payload = _membership_payload(population_id, agent_id)
+        try:
+            resp = request("DELETE", "/population_remove_agent/", json=payload)
+        finally:
+            _membership_changed(population_id, agent_id)
         return resp.json()
 
     @staticmethod
@@ -87,7 +150,10 @@ class Population:
         Returns { "status": "...", "message": "..." }
         """
         payload = {"population_id": population_id}
-        resp = request("DELETE", "/delete_population/", json=payload)
+        try:
+            resp = request("DELETE", "/delete_population/", json=payload)
+        finally:
+            invalidate_population(population_id)
         return resp.json()
 
     @staticmethod
@@ -105,15 +171,214 @@ class Population:
             "population_id": population_id,
             "n": n
         }
-        resp = request("POST", "/get_sub_population/", json=payload)
-        data = resp.json()
-        task_id = data.get("task_id")
-        if not task_id:
-            raise RequestError("No 'task_id' returned from get_sub_population endpoint.")
-
-        # The result endpoint is /get_sub_population_result/<task_id>/
-        result_endpoint = "/get_sub_population_result/{task_id}/"
 
         # Wait for completion and return the final result
-        final_data = Task(task_id, result_endpoint).wait()
-        return final_data
+        task = Task.submit("/get_sub_population/", payload, SUB_POPULATION_RESULT_ENDPOINT)
+        return task.wait()
+
+    @staticmethod
+    def sync(population_id, desired_agent_ids, concurrency=32, dry_run=False):
+        """
+        Makes a population's membership exactly desired_agent_ids: reads the
+        current members (bypassing the metadata cache), then adds and removes
+        only the differences, with at most `concurrency` calls in flight.
+
+        Returns a summary:
+            {"population_id": ..., "dry_run": bool,
+             "added": [...], "removed": [...], "unchanged": int,
+             "errors": [("add" | "remove", agent_id, exception), ...]}
+        With dry_run=True nothing is changed and added/removed list what would be.
+        Failed changes are reported in errors rather than raised.
+        """
+        current = Population.get_agents(population_id, refresh=True).get("agent_ids", [])
+        summary = _sync_plan(population_id, current, desired_agent_ids, dry_run)
+        if dry_run:
+            return summary
+
+        def apply(change):
+            operation, agent_id = change
+            method = Population.add_agent if operation == "add" else Population.remove_agent
+            try:
+                method(population_id, agent_id)
+                return operation, agent_id, None
+            except Exception as e:
+                return operation, agent_id, e
+
+        changes = [("add", a) for a in summary["added"]] + [("remove", a) for a in summary["removed"]]
+        if not changes:
+            return summary
+        client = current_client()
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(changes))) as executor:
+            outcomes = list(executor.map(lambda change: client.run(apply, change), changes))
+        return _sync_finish(summary, outcomes)
+
+    @staticmethod
+    def sample(population_id, n, seed=None, by=None, allocation="proportional", materialize=False):
+        """
+        Client-side alternative to get_sub_population: draws n agent ids from a
+        population locally (see sampling.Sampler), reproducibly for a given seed.
+
+        by stratifies the draw on a field of Agent.retrieve_details (or a
+        callable taking the details dict), split according to allocation
+        ("proportional", "equal" or {stratum: count}).
+
+        Returns the list of agent ids, or with materialize=True
+        {"new_population_id": ..., "agent_ids": [...]} after creating a
+        population holding them.
+        """
+        # Imported here because sampling builds on this module
+        from .sampling import Sampler
+
+        sampler = Sampler(population_id, seed=seed)
+        if by is None:
+            agent_ids = sampler.uniform(n)
+        else:
+            agent_ids = sampler.stratified(n, by, allocation)
+        if not materialize:
+            return agent_ids
+        new_population_id = sampler.materialize([agent_ids], name=f"sample of {population_id}")[0]
+        return {"new_population_id": new_population_id, "agent_ids": agent_ids}
+
+    @staticmethod
+    def survey(population_id, question_type, question_payload, concurrency=32, timeout=300):
+        """
+        Asks one question to every agent in a population.
+
+        Submits a /generate_agent_response/ task per agent, keeping at most
+        `concurrency` in flight, and waits on them together. This is a generator
+        that yields (agent_id, result_or_error) as each agent finishes; a failing
+        agent yields its exception instead of aborting the survey.
+
+        Usage:
+            for agent_id, answer in Population.survey(pid, "chat", {"question": "..."}):
+                if isinstance(answer, Exception):
+                    ...
+        """
+        agent_ids = Population.get_agents(population_id).get("agent_ids", [])
+        return run_tasks(
+            agent_ids,
+            lambda agent_id: Agent.submit_response(agent_id, question_type, question_payload),
+            concurrency=concurrency,
+            timeout=timeout
+        )
+
+
+class AsyncPopulation:
+    """
+    asyncio version of Population. Same arguments, validation and results, but
+    every method is a coroutine. Requires aiohttp (pip install simile[async]).
+    """
+    @staticmethod
+    async def create(name, read_permission="private", write_permission="private", readme=""):
+        """Async version of Population.create."""
+        payload = _create_payload(name, read_permission, write_permission, readme)
+        resp = await arequest("POST", "/create_population/", json=payload)
+        return resp.json()
+
+    @staticmethod
+    async def get_agents(population_id, refresh=False):
+        """Async version of Population.get_agents."""
+        params = {"population_id": population_id}
+        return await async_cached_get(
+            population_key(population_id), "/get_population_agents/", params, refresh=refresh
+        )
+
+    @staticmethod
+    async def add_agent(population_id, agent_id):
+        """Async version of Population.add_agent."""
+        payload = _membership_payload(population_id, agent_id)
+        try:
+            resp = await arequest("POST", "/population_add_agent/", json=payload)
+        finally:
+            _membership_changed(population_id, agent_id)
+        return resp.json()
+
+    @staticmethod
+    async def remove_agent(population_id, agent_id):
+        """Async version of Population.remove_agent."""
+        payload = _membership_payload(population_id, agent_id)
+        try:
+            resp = await arequest("DELETE", "/population_remove_agent/", json=payload)
+        finally:
+            _membership_changed(population_id, agent_id)
+        return resp.json()
+
+    @staticmethod
+    async def delete(population_id):
+        """Async version of Population.delete."""
+        payload = {"population_id": population_id}
+        try:
+            resp = await arequest("DELETE", "/delete_population/", json=payload)
+        finally:
+            invalidate_population(population_id)
+        return resp.json()
+
+    @staticmethod
+    async def get_sub_population(population_id="", n=1):
+        """Async version of Population.get_sub_population."""
+        payload = {
+            "population_id": population_id,
+            "n": n
+        }
+        task = await AsyncTask.submit("/get_sub_population/", payload, SUB_POPULATION_RESULT_ENDPOINT)
+        return await task.wait()
+
+    @staticmethod
+    async def sync(population_id, desired_agent_ids, concurrency=256, dry_run=False):
+        """Async version of Population.sync."""
+        data = await AsyncPopulation.get_agents(population_id, refresh=True)
+        summary = _sync_plan(population_id, data.get("agent_ids", []), desired_agent_ids, dry_run)
+        if dry_run:
+            return summary
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def apply(operation, agent_id):
+            method = AsyncPopulation.add_agent if operation == "add" else AsyncPopulation.remove_agent
+            async with semaphore:
+                try:
+                    await method(population_id, agent_id)
+                    return operation, agent_id, None
+                except Exception as e:
+                    return operation, agent_id, e
+
+        outcomes = await asyncio.gather(
+            *[apply("add", a) for a in summary["added"]],
+            *[apply("remove", a) for a in summary["removed"]]
+        )
+        return _sync_finish(summary, outcomes)
+
+    @staticmethod
+    async def survey(population_id, question_type, question_payload, concurrency=256, timeout=300):
+        """
+        Async version of Population.survey: an async generator yielding
+        (agent_id, result_or_error) as each agent finishes.
+
+            async for agent_id, answer in AsyncPopulation.survey(pid, "chat", {...}):
+                ...
+        """
+        data = await AsyncPopulation.get_agents(population_id)
+        agent_ids = iter(data.get("agent_ids", []))
+
+        async def ask(agent_id):
+            try:
+                task = await AsyncAgent.submit_response(agent_id, question_type, question_payload)
+                return agent_id, await task.wait(timeout=timeout)
+            except Exception as e:
+                return agent_id, e
+
+        in_flight = set()
+        try:
+            while True:
+                for agent_id in agent_ids:
+                    in_flight.add(asyncio.ensure_future(ask(agent_id)))
+                    if len(in_flight) >= concurrency:
+                        break
+                if not in_flight:
+                    break
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    yield finished.result()
+        finally:
+            for pending in in_flight:
+                pending.cancel()
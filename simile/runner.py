@@ -0,0 +1,310 @@
+# simile/runner.py
+"""
+Sharded, checkpointed survey runs: every question of a job asked to every
+agent, spread over several processes.
+
+    python -m simile run job.json --out run1 --processes 8 --concurrency 64
+
+The job spec is a JSON file:
+
+    {
+      "questions": [
+        {"id": "q1", "type": "categorical", "payload": {"question": "...", "options": ["yes", "no"]}},
+        {"id": "q2", "type": "chat", "payload": {"question": "..."}}
+      ],
+      "populations": ["<population id>", ...],
+      "agents": ["<agent id>", ...]
+    }
+
+"populations" and "agents" can be combined; agents are deduplicated.
+Question ids default to "q<index>".
+
+Agents are split into shards by a hash of their id, and a process pool runs
+the shards, each process with its own Client and TaskGroup poller. The output
+directory holds:
+  * results-<shard>.jsonl: one line per (agent, question) outcome, written as
+    it finishes ({"agent_id", "question_id", "result"} or {..., "error"})
+  * checkpoint-<shard>.jsonl: completed pairs (see utils.Checkpoint); a rerun
+    with the same --out skips them and retries only failed or missing pairs
+  * manifest.json: the shard count, fixed by the first run
+  * summary.json: a columnar summary of the latest outcome of every pair
+
+Client-side rate limits (config.rate_limits) are split evenly across the
+processes.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import config
+from .client import INHERITED_SETTINGS, Client
+from .resource_agent import Agent
+from .resource_population import Population
+from .task import run_tasks
+from .utils import Checkpoint, canonical_hash, canonical_json, read_jsonl
+
+MANIFEST = "manifest.json"
+SUMMARY = "summary.json"
+
+
+def load_job(path):
+    """Reads and validates a job spec; returns it with question ids filled in."""
+    with open(path, "r", encoding="utf-8") as f:
+        job = json.load(f)
+    questions = job.get("questions")
+    if not questions:
+        raise ValueError("A job needs at least one question.")
+    if not job.get("populations") and not job.get("agents"):
+        raise ValueError("A job needs 'populations' and/or 'agents'.")
+
+    ids = set()
+    for index, question in enumerate(questions):
+        if "type" not in question or "payload" not in question:
+            raise ValueError(f"Question {index} needs 'type' and 'payload'.")
+        question.setdefault("id", f"q{index}")
+        if question["id"] in ids:
+            raise ValueError(f"Duplicate question id {question['id']!r}.")
+        ids.add(question["id"])
+    return job
+
+
+def resolve_agents(job):
+    """Returns the job's agent ids: its populations' members plus "agents", deduplicated."""
+    agent_ids = []
+    for population_id in job.get("populations", []):
+        agent_ids.extend(Population.get_agents(population_id).get("agent_ids", []))
+    agent_ids.extend(job.get("agents", []))
+    return list(dict.fromkeys(agent_ids))
+
+
+def shard_of(agent_id, shards):
+    """Stable shard index of an agent (the same in every process and run)."""
+    return int(canonical_hash(agent_id)[:8], 16) % shards
+
+
+def _split_rate_limits(rate_limits, parts):
+    """Divides rate, burst and max_in_flight of every endpoint class across parts."""
+    split = {}
+    for name, limits in (rate_limits or {}).items():
+        limits = dict(limits)
+        if limits.get("rate"):
+            limits["rate"] = limits["rate"] / parts
+        for key in ("burst", "max_in_flight"):
+            if limits.get(key):
+                limits[key] = max(limits[key] // parts, 1)
+        split[name] = limits
+    return split
+
+
+def _client_settings(processes):
+    """Settings for the Client of each worker process, taken from simile.config."""
+    settings = {name: getattr(config, name) for name in INHERITED_SETTINGS}
+    if not isinstance(settings["transport"], str):
+        # Transport instances can't be shared with other processes
+        settings["transport"] = "requests"
+    settings["rate_limits"] = _split_rate_limits(settings["rate_limits"], processes)
+    settings["api_key"] = config.api_key
+    settings["api_base"] = config.api_base
+    return settings
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path, value):
+    # Write then rename, so a crash never leaves a half-written file
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(value, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporary, path)
+
+
+def _shard_path(out_dir, kind, shard):
+    return os.path.join(out_dir, f"{kind}-{shard:04d}.jsonl")
+
+
+def run_shard(shard, agent_ids, questions, out_dir, settings, concurrency=32, timeout=300):
+    """
+    Asks every question to every agent of one shard, skipping pairs in the
+    shard's checkpoint. Runs in a worker process; returns its counts.
+    """
+    counts = {"shard": shard, "skipped": 0, "completed": 0, "failed": 0}
+    questions = {question["id"]: question for question in questions}
+    client = Client(**settings)
+
+    with client, Checkpoint(_shard_path(out_dir, "checkpoint", shard)) as checkpoint, \
+            open(_shard_path(out_dir, "results", shard), "a", encoding="utf-8") as results:
+        def pending():
+            for agent_id in agent_ids:
+                for question_id in questions:
+                    if (agent_id, question_id) in checkpoint:
+                        counts["skipped"] += 1
+                    else:
+                        yield agent_id, question_id
+
+        def submit(pair):
+            agent_id, question_id = pair
+            question = questions[question_id]
+            return Agent.submit_response(agent_id, question["type"], question["payload"])
+
+        with client.activate():
+            outcomes = run_tasks(pending(), submit, concurrency=concurrency, timeout=timeout)
+            for (agent_id, question_id), outcome in outcomes:
+                record = {"agent_id": agent_id, "question_id": question_id}
+                if isinstance(outcome, Exception):
+                    record["error"] = f"{type(outcome).__name__}: {outcome}"
+                    counts["failed"] += 1
+                else:
+                    record["result"] = outcome
+                    counts["completed"] += 1
+                results.write(json.dumps(record, ensure_ascii=False) + "\n")
+                results.flush()
+                if "result" in record:
+                    # Only after the result line is on disk
+                    checkpoint.add([agent_id, question_id])
+    return counts
+
+
+def _answer(result):
+    if isinstance(result, dict) and "answer" in result:
+        return result["answer"]
+    return result
+
+
+def summarize(out_dir, shards):
+    """
+    Builds the columnar summary from the shards' result files: one entry per
+    (agent, question) pair, keeping the latest outcome of each. Agent ids,
+    question ids, answers and errors are dictionary-encoded, so columns are
+    lists of small integers:
+
+        {"agents": [...], "questions": [...], "answers": [...], "errors": [...],
+         "columns": {"agent": [...], "question": [...], "answer": [...], "error": [...]}}
+
+    answer/error hold an index or null. An answer is the result's "answer"
+    field when present, otherwise the whole result.
+    """
+    dictionaries = {"agents": {}, "questions": {}, "answers": {}, "errors": {}}
+
+    def encode(name, value, key=None):
+        values = dictionaries[name]
+        key = value if key is None else key
+        if key not in values:
+            values[key] = (len(values), value)
+        return values[key][0]
+
+    latest = {}  # (agent, question) -> latest record
+    for shard in range(shards):
+        path = _shard_path(out_dir, "results", shard)
+        if not os.path.exists(path):
+            continue
+        for record in read_jsonl(path):
+            pair = (encode("agents", record["agent_id"]), encode("questions", record["question_id"]))
+            latest[pair] = record
+
+    # Answers and errors are only encoded for latest outcomes, so an error
+    # that a rerun has since fixed doesn't linger in the "errors" dictionary
+    columns = {"agent": [], "question": [], "answer": [], "error": []}
+    for agent, question in sorted(latest):
+        record = latest[agent, question]
+        answer = error = None
+        if "error" in record:
+            error = encode("errors", record["error"])
+        else:
+            value = _answer(record["result"])
+            answer = encode("answers", value, canonical_json(value))
+        columns["agent"].append(agent)
+        columns["question"].append(question)
+        columns["answer"].append(answer)
+        columns["error"].append(error)
+
+    summary = {name: [value for _, value in values.values()] for name, values in dictionaries.items()}
+    summary["columns"] = columns
+    summary["completed"] = sum(error is None for error in columns["error"])
+    summary["failed"] = len(columns["error"]) - summary["completed"]
+    _write_json(os.path.join(out_dir, SUMMARY), summary)
+    return summary
+
+
+def run(job, out_dir, processes=None, shards=None, concurrency=32, timeout=300, progress=None):
+    """
+    Runs a job (a spec dict, see load_job) into out_dir and returns the summary.
+    processes defaults to the CPU count; shards defaults to processes and is
+    fixed by the first run in out_dir. progress, if given, is called with each
+    shard's counts as it finishes.
+    """
+    processes = processes or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir)
+    if manifest is None:
+        manifest = {"shards": shards or processes}
+        _write_json(os.path.join(out_dir, MANIFEST), manifest)
+    shards = manifest["shards"]
+
+    by_shard = [[] for _ in range(shards)]
+    for agent_id in resolve_agents(job):
+        by_shard[shard_of(agent_id, shards)].append(agent_id)
+
+    settings = _client_settings(min(processes, shards))
+    with ProcessPoolExecutor(max_workers=min(processes, shards)) as executor:
+        futures = [
+            executor.submit(
+                run_shard, shard, agent_ids, job["questions"], out_dir, settings, concurrency, timeout
+            )
+            for shard, agent_ids in enumerate(by_shard)
+            if agent_ids
+        ]
+        for future in as_completed(futures):
+            counts = future.result()
+            if progress is not None:
+                progress(counts)
+    return summarize(out_dir, shards)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m simile run", description=__doc__.split("\n\n")[0])
+    parser.add_argument("job", help="job spec (JSON)")
+    parser.add_argument("--out", required=True, help="output directory; rerunning into it resumes")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--shards", type=int, default=None, help="shards on the first run (default: --processes)")
+    parser.add_argument("--concurrency", type=int, default=32, help="tasks in flight per process")
+    parser.add_argument("--timeout", type=float, default=300, help="per-task timeout (s)")
+    parser.add_argument("--api-key", default=os.environ.get("SIMILE_API_KEY"), help="default: $SIMILE_API_KEY")
+    parser.add_argument("--api-base", default=os.environ.get("SIMILE_API_BASE"), help="default: $SIMILE_API_BASE")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or SIMILE_API_KEY)")
+    config.configure(key=args.api_key, base=args.api_base)
+    job = load_job(args.job)
+
+    started = time.perf_counter()
+
+    def progress(counts):
+        print(
+            f"shard {counts['shard']}: {counts['completed']} completed, "
+            f"{counts['failed']} failed, {counts['skipped']} skipped"
+        )
+
+    summary = run(
+        job, args.out, processes=args.processes, shards=args.shards,
+        concurrency=args.concurrency, timeout=args.timeout, progress=progress
+    )
+    print(
+        f"{summary['completed']} pairs completed, {summary['failed']} failed "
+        f"in {time.perf_counter() - started:.1f}s; summary in {os.path.join(args.out, SUMMARY)}"
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
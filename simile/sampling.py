@@ -0,0 +1,200 @@
+# simile/sampling.py
+"""
+Local, reproducible sub-population sampling.
+
+Population.get_sub_population starts a server task for every draw. For plain
+random draws, Sampler does the same work locally over the population's
+agent-id list (one Population.get_agents call, served from the metadata
+cache when configured):
+
+    from simile.sampling import Sampler
+
+    sampler = Sampler(population_id, seed=42)
+    ids = sampler.uniform(100)
+    ids = sampler.stratified(100, by="gender")                # fields from Agent.retrieve_details
+    draws = sampler.samples(500, 100, by="gender")           # 500 draws in one pass
+    population_ids = sampler.materialize(draws[:10], name="sweep")
+
+The same seed always gives the same draws for the same agent ids. Draw k of
+samples() depends only on (seed, k), so a sweep can be extended or resumed.
+"""
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import current_client
+from .resource_agent import Agent
+from .resource_population import Population
+
+
+def allocate(n, sizes, allocation="proportional"):
+    """
+    Splits n draws across strata. sizes maps stratum -> number of agents.
+    allocation is "proportional" (largest remainder), "equal", or a dict
+    stratum -> count. Like uniform draws, raises ValueError rather than
+    returning fewer draws than asked for: when n exceeds the number of agents,
+    or a dict count exceeds its stratum's size.
+    """
+    if isinstance(allocation, dict):
+        unknown = set(allocation) - set(sizes)
+        if unknown:
+            raise ValueError(f"Unknown stratum/strata: {', '.join(map(str, sorted(unknown, key=str)))}.")
+        for stratum, count in allocation.items():
+            if not 0 <= count <= sizes[stratum]:
+                raise ValueError(
+                    f"Cannot draw {count} agents from stratum {stratum!r} of {sizes[stratum]}."
+                )
+        return dict(allocation)
+
+    if n < 0:
+        raise ValueError(f"n must be >= 0, got {n}.")
+    total = sum(sizes.values())
+    if n > total:
+        raise ValueError(f"Cannot draw {n} agents from a population of {total}.")
+    strata = sorted(sizes, key=str)
+    if allocation == "equal":
+        weights = {stratum: 1 for stratum in strata}
+    elif allocation == "proportional":
+        weights = sizes
+    else:
+        raise ValueError("allocation must be 'proportional', 'equal' or a dict.")
+
+    counts = {stratum: 0 for stratum in strata}
+    remaining = n
+    # Hand out whole shares, then remainders, skipping strata that are full
+    while remaining:
+        open_strata = [s for s in strata if counts[s] < sizes[s]]
+        weight = sum(weights[s] for s in open_strata)
+        shares = {s: remaining * weights[s] / weight for s in open_strata}
+        given = 0
+        for s in open_strata:
+            take = min(int(shares[s]), sizes[s] - counts[s])
+            counts[s] += take
+            given += take
+        by_remainder = sorted(open_strata, key=lambda s: (-(shares[s] - int(shares[s])), str(s)))
+        for s in by_remainder:
+            if given == remaining:
+                break
+            if counts[s] < sizes[s]:
+                counts[s] += 1
+                given += 1
+        remaining -= given
+    return {stratum: count for stratum, count in counts.items() if count}
+
+
+class Sampler:
+    """
+    Seeded sampling over one population's agents. Agent ids are fetched once
+    (and sorted, so results don't depend on server ordering); agent details are
+    fetched on first stratified use, `concurrency` at a time, and kept.
+    Requests go through the client that was current when the sampler was created.
+    """
+    def __init__(self, population_id, seed=None, concurrency=16, refresh=False):
+        self._client = current_client()
+        self.population_id = population_id
+        self.seed = seed
+        self.concurrency = concurrency
+        agents = self._client.run(Population.get_agents, population_id, refresh=refresh)
+        self.agent_ids = sorted(agents.get("agent_ids", []))
+        self._rng = random.Random(seed)
+        self._details = {}
+        self._strata = {}  # by -> {stratum: [agent ids]}
+
+    def __len__(self):
+        return len(self.agent_ids)
+
+    def _draw_rng(self, index):
+        if self.seed is None:
+            return random.Random()
+        return random.Random(f"{self.seed}:{index}")
+
+    def details(self):
+        """Returns {agent_id: details} for every agent, fetching what's missing."""
+        missing = [agent_id for agent_id in self.agent_ids if agent_id not in self._details]
+        if missing:
+            def fetch(agent_id):
+                return self._client.run(Agent.retrieve_details, agent_id)
+
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for agent_id, details in zip(missing, executor.map(fetch, missing)):
+                    self._details[agent_id] = details
+        return {agent_id: self._details[agent_id] for agent_id in self.agent_ids}
+
+    def strata(self, by):
+        """
+        Groups agent ids by a details field name, or by a callable taking the
+        details dict. Returns {stratum: [agent ids]}.
+        """
+        key = by
+        if key not in self._strata:
+            get = by if callable(by) else (lambda details: details.get(by))
+            groups = {}
+            for agent_id, details in self.details().items():
+                stratum = get(details)
+                try:
+                    hash(stratum)
+                except TypeError:
+                    stratum = repr(stratum)
+                groups.setdefault(stratum, []).append(agent_id)
+            self._strata[key] = groups
+        return self._strata[key]
+
+    def _uniform(self, rng, n):
+        if n < 0:
+            raise ValueError(f"n must be >= 0, got {n}.")
+        if n > len(self.agent_ids):
+            raise ValueError(f"Cannot draw {n} agents from a population of {len(self.agent_ids)}.")
+        return rng.sample(self.agent_ids, n)
+
+    def _stratified(self, rng, counts, groups):
+        chosen = []
+        for stratum in sorted(counts, key=str):
+            chosen.extend(rng.sample(groups[stratum], counts[stratum]))
+        return chosen
+
+    def uniform(self, n):
+        """Draws n distinct agent ids uniformly at random."""
+        return self._uniform(self._rng, n)
+
+    def stratified(self, n, by, allocation="proportional"):
+        """
+        Draws n agent ids (the sum of the counts if `allocation` is a dict),
+        split across the strata of `by` according to `allocation` (see
+        allocate()) and drawn uniformly within each stratum.
+        """
+        groups = self.strata(by)
+        counts = allocate(n, {stratum: len(ids) for stratum, ids in groups.items()}, allocation)
+        return self._stratified(self._rng, counts, groups)
+
+    def samples(self, count, n, by=None, allocation="proportional"):
+        """
+        Draws `count` independent samples of n agent ids in one pass: the id
+        list, strata and allocation are computed once and reused by every draw.
+        """
+        if by is None:
+            return [self._uniform(self._draw_rng(index), n) for index in range(count)]
+        groups = self.strata(by)
+        counts = allocate(n, {stratum: len(ids) for stratum, ids in groups.items()}, allocation)
+        return [self._stratified(self._draw_rng(index), counts, groups) for index in range(count)]
+
+    def materialize(self, samples, name="sample", read_permission="private", write_permission="private"):
+        """
+        Creates one population per sample (named "<name>-<index>") and adds its
+        agents, `concurrency` requests at a time. Returns the new population ids
+        in the order of `samples`.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            created = list(executor.map(
+                lambda index: self._client.run(
+                    Population.create, f"{name}-{index}", read_permission, write_permission
+                )["population_id"],
+                range(len(samples))
+            ))
+            additions = [
+                executor.submit(self._client.run, Population.add_agent, population_id, agent_id)
+                for population_id, agent_ids in zip(created, samples)
+                for agent_id in agent_ids
+            ]
+            for future in additions:
+                future.result()
+        return created
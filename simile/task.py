@@ -1,25 +1,128 @@
 # simile/task.py
+import asyncio
+import heapq
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures, FIRST_COMPLETED
+from . import instrumentation
 from .api_requestor import request
+from .async_api_requestor import request as arequest
+from .error import RequestError
+from .client import current_client
+from .journal import get_journal
+from .payload import is_streamed
+from .utils import parse_retry_after
 
-class Task:
+# Upper bound (seconds) on the wait before re-polling after a transient poll error
+POLL_ERROR_BACKOFF_MAX = 30
+
+
+def _is_transient(error):
+    """True for poll failures worth retrying: 429, 5xx, connection errors and open circuits."""
+    if not isinstance(error, RequestError):
+        return False
+    return error.status_code is None or error.status_code == 429 or error.status_code >= 500
+
+
+class PollSchedule:
     """
-    Represents an asynchronous Celery-like task. 
-    Contains logic for polling the result endpoint until completion or failure.
-    Used internally to hide the async nature from the end user.
+    Adaptive polling schedule: fast first polls, then exponential backoff with
+    jitter up to max_interval. Short tasks are noticed quickly while long tasks
+    don't get hammered with pointless polls.
+    """
+    def __init__(self, initial=0.25, factor=1.6, max_interval=5, jitter=0.2):
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def delay(self, polls):
+        """Seconds to wait after the given number of polls (>= 1) before the next one."""
+        delay = min(self.initial * self.factor ** max(polls - 1, 0), self.max_interval)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return delay
+
+
+class BaseTask:
+    """
+    State and status handling shared by Task and AsyncTask; the subclasses
+    add submit(), poll() and wait() (blocking or as coroutines).
     """
     def __init__(self, task_id, result_endpoint):
         self.task_id = task_id
         self.result_endpoint = result_endpoint  # e.g. '/generate_agent_response_result/{task_id}/'
+        self._client = current_client()  # polls go through the client that created the task
         self._last_status = None
         self._last_result = None
         self._finished = False
+        self._exception = None  # client-side failure (e.g. submission or poll error)
+        self._polls = 0
+        self._poll_errors = 0  # consecutive transient poll failures (see TaskGroup)
+        self._retry_after = None
+        self._journal_entry = None  # (TaskJournal, fingerprint) while journaled
+        # Lifecycle timestamps (time.time()) for instrumentation
+        self._submitted_at = time.time()
+        self._running_at = None
+        self._finished_at = None
+        self._last_poll_at = None
+        self._prev_poll_at = None
+
+    @classmethod
+    def _resume(cls, endpoint, payload):
+        """
+        Returns (journal, fingerprint, resumed task or None); all None without a
+        journal or for streamed payloads, which can't be fingerprinted without
+        consuming them.
+        """
+        journal = get_journal()
+        if journal is None or is_streamed(payload):
+            return None, None, None
+        fingerprint = journal.fingerprint(endpoint, payload)
+        entry = journal.lookup(fingerprint)
+        if entry is None:
+            return journal, fingerprint, None
+        task_id, result_endpoint = entry
+        task = cls(task_id, result_endpoint)
+        task._journal_entry = (journal, fingerprint)
+        return journal, fingerprint, task
+
+    def _journal_record(self, journal, fingerprint, endpoint):
+        if journal is not None:
+            journal.record(fingerprint, endpoint, self.result_endpoint, self.task_id)
+            self._journal_entry = (journal, fingerprint)
+
+    def _journal_complete(self):
+        if self._journal_entry is not None:
+            journal, fingerprint = self._journal_entry
+            journal.complete(fingerprint)
+            self._journal_entry = None
+
+    @classmethod
+    def _from_submit_response(cls, endpoint, data, result_endpoint):
+        task_id = data.get("task_id")
+        if not task_id:
+            name = endpoint.strip("/")
+            raise RequestError(f"No 'task_id' returned from {name} endpoint.")
+        task = cls(task_id, result_endpoint)
+        instrumentation.task_event("submitted", task)
+        return task
 
     @property
     def last_status(self):
         """Returns the last known status from the server."""
         return self._last_status
 
+    @property
+    def finished(self):
+        """True once the task has reached SUCCESS or FAILURE (or failed client-side)."""
+        return self._finished
+
+    @property
+    def polls(self):
+        """Number of polls made to the result endpoint so far."""
+        return self._polls
+
     @property
     def result(self):
         """If the task has finished successfully, returns the result payload."""
@@ -29,19 +132,52 @@ class Task:
 
     @property
     def error(self):
-        """If the task has failed, returns the error message."""
+        """If the task has failed, returns the error message (or client-side exception)."""
+        if self._exception is not None:
+            return self._exception
         if self._finished and self._last_status == "FAILURE":
             return self._last_result
         return None
 
-    def poll(self):
+    def _url(self):
+        return self.result_endpoint.format(task_id=self.task_id)
+
+    def stats(self):
         """
-        Perform a single poll to the result endpoint,
-        storing the status in self._last_status and marking self._finished if done.
+        Lifecycle timings for this task, as a dict:
+          * polls: result-endpoint polls made
+          * duration: seconds from submission to completion
+          * queued: seconds from submission until the server first reported
+            a status other than PENDING
+          * wasted_wait: seconds between the last PENDING poll and the poll that
+            saw completion, an upper bound on time lost to the poll interval
+        Timings that aren't known (yet) are None.
         """
-        url = self.result_endpoint.format(task_id=self.task_id)
-        resp = request("GET", url)
-        data = resp.json()
+        def since_submit(at):
+            return at - self._submitted_at if at is not None else None
+
+        wasted = None
+        if self._finished_at is not None and self._prev_poll_at is not None:
+            wasted = self._finished_at - self._prev_poll_at
+        return {
+            "task_id": self.task_id,
+            "status": "ERROR" if self._exception is not None else self._last_status,
+            "polls": self._polls,
+            "submitted_at": self._submitted_at,
+            "running_at": self._running_at,
+            "finished_at": self._finished_at,
+            "duration": since_submit(self._finished_at),
+            "queued": since_submit(self._running_at),
+            "wasted_wait": wasted,
+        }
+
+    def _update(self, data, headers=None):
+        """Apply one result-endpoint payload to the task state."""
+        now = time.time()
+        self._polls += 1
+        self._poll_errors = 0
+        self._prev_poll_at, self._last_poll_at = self._last_poll_at, now
+        self._retry_after = parse_retry_after(headers)
 
         status_ = data.get("status")
         self._last_status = status_
@@ -59,23 +195,434 @@ class Task:
             # Some other custom statuses are treated as "still running"
             pass
 
-    def wait(self, interval=2, timeout=300):
+        if status_ not in (None, "PENDING") and self._running_at is None:
+            self._running_at = now
+            instrumentation.task_event("running", self)
+        if self._finished:
+            self._finished_at = now
+            self._journal_complete()
+            instrumentation.task_event("finished", self)
+
+    def _poll_failed(self, error):
+        """A journaled task the server no longer knows about can't be resumed."""
+        if isinstance(error, RequestError) and error.status_code == 404:
+            self._journal_complete()
+
+    def _adopt(self, task):
+        """Take over the identity of a submitted task (used by TaskGroup.submit)."""
+        self.task_id = task.task_id
+        self.result_endpoint = task.result_endpoint
+        self._client = task._client
+        self._journal_entry = task._journal_entry
+        self._submitted_at = task._submitted_at
+
+    def _fail(self, exception):
+        """Mark the task as finished because of a client-side error."""
+        self._finished = True
+        self._exception = exception
+        self._finished_at = time.time()
+        # A failed submission (TaskGroup placeholder) never became a server task;
+        # the failed request is already in the request metrics
+        if self.result_endpoint is not None:
+            instrumentation.task_event("finished", self)
+
+    def _outcome(self):
+        """Returns the result of a finished task, or raises its failure."""
+        if self._exception is not None:
+            raise self._exception
+        if self._last_status == "SUCCESS":
+            return self._last_result
+        else:
+            raise RuntimeError(f"Task {self.task_id} failed with error: {self._last_result}")
+
+    def _poll_error_delay(self, schedule, error):
+        """Backoff before re-polling after self._poll_errors consecutive transient failures."""
+        delay = min(schedule.initial * 2 ** self._poll_errors, POLL_ERROR_BACKOFF_MAX)
+        if schedule.jitter:
+            delay *= 1 + random.uniform(-schedule.jitter, schedule.jitter)
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _timeout_error(self, timeout, cause=None):
+        error = TimeoutError(f"Task {self.task_id} did not complete within {timeout} seconds.")
+        error.__cause__ = cause
+        return error
+
+    def _next_delay(self, interval, schedule):
+        """Seconds to sleep before the next poll; honors a server Retry-After hint."""
+        if interval is not None:
+            delay = interval
+        else:
+            delay = (schedule or PollSchedule()).delay(self._polls)
+        if self._retry_after is not None:
+            delay = max(delay, self._retry_after)
+        return delay
+
+
+class Task(BaseTask):
+    """
+    Represents an asynchronous Celery-like task.
+    Contains logic for polling the result endpoint until completion or failure.
+    Used internally to hide the async nature from the end user.
+    """
+    @classmethod
+    def submit(cls, endpoint, payload, result_endpoint):
+        """
+        POST the payload to a task-creating endpoint and return a Task for
+        the server-side job (without waiting on it).
+
+        If a task journal is configured and an identical request is still
+        pending from an earlier run, reattaches to that task instead.
+        """
+        journal, fingerprint, task = cls._resume(endpoint, payload)
+        if task is not None:
+            return task
+        resp = request("POST", endpoint, json=payload)
+        task = cls._from_submit_response(endpoint, resp.json(), result_endpoint)
+        task._journal_record(journal, fingerprint, endpoint)
+        return task
+
+    def poll(self):
+        """
+        Perform a single poll to the result endpoint,
+        storing the status in self._last_status and marking self._finished if done.
+        """
+        try:
+            with self._client.activate():
+                resp = request("GET", self._url())
+        except RequestError as e:
+            self._poll_failed(e)
+            raise
+        self._update(resp.json(), resp.headers)
+
+    def wait(self, interval=None, timeout=300, schedule=None):
         """
         Poll in a loop until the task finishes or times out.
         Returns the final result on success, or raises an exception on failure or timeout.
+
+        By default polls on an adaptive PollSchedule (pass `schedule` to tune it);
+        pass a fixed `interval` in seconds to poll at a constant rate instead.
+        Transient poll failures (429, 5xx, connection errors, an open circuit
+        breaker) are retried with capped backoff until the timeout, since the
+        server-side task keeps running.
         """
         start = time.time()
         while True:
-            self.poll()
+            try:
+                self.poll()
+            except RequestError as e:
+                if not _is_transient(e):
+                    raise
+                if time.time() - start > timeout:
+                    raise self._timeout_error(timeout, e)
+                self._poll_errors += 1
+                time.sleep(self._poll_error_delay(schedule or PollSchedule(), e))
+                continue
             if self._finished:
                 break
             if time.time() - start > timeout:
+                raise self._timeout_error(timeout)
+            time.sleep(self._next_delay(interval, schedule))
+
+        return self._outcome()
+
+
+class AsyncTask(BaseTask):
+    """
+    Awaitable version of Task for use with the async client.
+    Polling never blocks the event loop, so thousands of tasks can be awaited at once:
+
+        task = await AsyncTask.submit(...)
+        result = await task          # same as: await task.wait()
+    """
+    @classmethod
+    async def submit(cls, endpoint, payload, result_endpoint):
+        """Async version of Task.submit."""
+        journal, fingerprint, task = cls._resume(endpoint, payload)
+        if task is not None:
+            return task
+        resp = await arequest("POST", endpoint, json=payload)
+        task = cls._from_submit_response(endpoint, resp.json(), result_endpoint)
+        task._journal_record(journal, fingerprint, endpoint)
+        return task
+
+    async def poll(self):
+        """Async version of Task.poll."""
+        try:
+            with self._client.activate():
+                resp = await arequest("GET", self._url())
+        except RequestError as e:
+            self._poll_failed(e)
+            raise
+        self._update(resp.json(), resp.headers)
+
+    async def wait(self, interval=None, timeout=300, schedule=None):
+        """
+        Async version of Task.wait; sleeps with asyncio.sleep between polls.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        while True:
+            try:
+                await self.poll()
+            except RequestError as e:
+                if not _is_transient(e):
+                    raise
+                if loop.time() - start > timeout:
+                    raise self._timeout_error(timeout, e)
+                self._poll_errors += 1
+                await asyncio.sleep(self._poll_error_delay(schedule or PollSchedule(), e))
+                continue
+            if self._finished:
+                break
+            if loop.time() - start > timeout:
+                raise self._timeout_error(timeout)
+            await asyncio.sleep(self._next_delay(interval, schedule))
+
+        return self._outcome()
+
+    def __await__(self):
+        return self.wait().__await__()
+
+
+class TaskGroup:
+    """
+    Tracks many Tasks on a single scheduler loop instead of one sleeping
+    wait() loop per task. Each task is polled on its own adaptive schedule;
+    polls that come due together are sent concurrently over a small thread pool.
+
+    Usage:
+        with TaskGroup(timeout=600) as group:
+            for agent_id in agent_ids:
+                group.add(Agent.submit_response(agent_id, "chat", question))
+            for task in group.as_completed():
+                print(task.task_id, task.result, task.error, task.polls)
+
+    A poll that fails transiently (429, 5xx, connection error, open circuit
+    breaker) is retried with capped exponential backoff, since the server-side
+    task keeps running; a task only fails on other errors or its timeout.
+
+    A group is driven from one thread (the one iterating as_completed/wait_all);
+    tasks may be added between iterations.
+    """
+    def __init__(self, tasks=(), schedule=None, timeout=None, task_timeout=None, max_workers=None):
+        """
+        * schedule: PollSchedule used for every task (default: PollSchedule())
+        * timeout: total deadline in seconds for the whole group, from creation
+        * task_timeout: per-task limit in seconds, from when the task was added
+        * max_workers: max concurrent HTTP calls (default: the client's pool_maxsize)
+
+        Submissions made through the group use the client that was current
+        when the group was created.
+        """
+        self.schedule = schedule or PollSchedule()
+        self.timeout = timeout
+        self.task_timeout = task_timeout
+        self._deadline = time.time() + timeout if timeout is not None else None
+        self._client = current_client()
+        self._max_workers = max_workers or self._client.pool_maxsize
+        self._pool = None
+        self._tasks = []
+        self._due = []         # heap of (poll_at, seq, task)
+        self._futures = {}     # future -> (task, is_submission)
+        self._started = {}     # task -> time it was added
+        self._finished = []    # finished tasks not yet yielded by as_completed
+        self._unfinished = 0
+        self._seq = 0
+        for task in tasks:
+            self.add(task)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    @property
+    def tasks(self):
+        """All tasks added to the group, in the order they were added."""
+        return list(self._tasks)
+
+    @property
+    def pending(self):
+        """Number of tasks that have not been yielded as completed yet."""
+        return self._unfinished
+
+    def close(self):
+        """Shuts down the group's thread pool (waits for in-progress HTTP calls)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers)
+        return self._pool
+
+    def _schedule(self, task, poll_at):
+        self._seq += 1
+        heapq.heappush(self._due, (poll_at, self._seq, task))
+
+    def _track(self, task):
+        self._tasks.append(task)
+        self._started[task] = time.time()
+        self._unfinished += 1
+
+    def _done(self, task):
+        self._started.pop(task, None)
+        self._finished.append(task)
+
+    def add(self, task):
+        """Starts tracking an already-submitted Task; its first poll is immediate."""
+        if not isinstance(task, Task):
+            # An AsyncTask polls with coroutines, which the group's threads can't run
+            raise TypeError(
+                f"TaskGroup tracks Task objects, not {type(task).__name__}; await AsyncTasks instead."
+            )
+        self._track(task)
+        if task.finished:
+            self._done(task)
+        else:
+            self._schedule(task, time.time())
+        return task
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs), which must submit a server task and return it
+        (e.g. Agent.submit_response), on the group's thread pool and tracks the result.
+
+        Returns a placeholder Task right away; it takes over the submitted task's
+        id once the submission completes, or finishes with the submission error.
+        """
+        task = self._client.run(Task, None, None)
+        self._track(task)
+        self._futures[self._executor().submit(self._client.run, fn, *args, **kwargs)] = (task, True)
+        return task
+
+    def poll_counts(self):
+        """Returns {task_id: number of polls} for every task in the group."""
+        return {task.task_id: task.polls for task in self._tasks}
+
+    def _dispatch_due(self, now):
+        while self._due and self._due[0][0] <= now:
+            _, _, task = heapq.heappop(self._due)
+            self._futures[self._executor().submit(task.poll)] = (task, False)
+
+    def _timed_out(self, task, now):
+        started = self._started.get(task, now)
+        return self.task_timeout is not None and now - started > self.task_timeout
+
+    def _handle(self, future, task, is_submission, now):
+        error = future.exception()
+        if error is not None and not is_submission and _is_transient(error):
+            if not self._timed_out(task, now):
+                task._poll_errors += 1
+                self._schedule(task, now + task._poll_error_delay(self.schedule, error))
+                return
+            error = task._timeout_error(self.task_timeout, error)
+        if error is not None:
+            task._fail(error)
+        elif is_submission:
+            task._adopt(future.result())
+            # A freshly submitted task is almost never done yet; give it a moment
+            self._schedule(task, now + self.schedule.initial)
+            return
+        elif not task.finished:
+            if self._timed_out(task, now):
+                task._fail(task._timeout_error(self.task_timeout))
+            else:
+                self._schedule(task, now + task._next_delay(None, self.schedule))
+                return
+        self._done(task)
+
+    def as_completed(self):
+        """
+        Generator yielding each Task as soon as it finishes (successfully or not).
+        Raises TimeoutError if the group's total deadline passes first.
+        """
+        while self._unfinished:
+            if self._finished:
+                self._unfinished -= 1
+                yield self._finished.pop(0)
+                continue
+
+            now = time.time()
+            if self._deadline is not None and now > self._deadline:
                 raise TimeoutError(
-                    f"Task {self.task_id} did not complete within {timeout} seconds."
+                    f"{self._unfinished} task(s) did not complete within {self.timeout} seconds."
                 )
-            time.sleep(interval)
+            self._dispatch_due(now)
 
-        if self._last_status == "SUCCESS":
-            return self._last_result
-        else:
-            raise RuntimeError(f"Task {self.task_id} failed with error: {self._last_result}")
+            # Sleep until something finishes, the next poll is due or the deadline hits
+            wake_at = self._due[0][0] if self._due else None
+            if self._deadline is not None:
+                wake_at = self._deadline if wake_at is None else min(wake_at, self._deadline)
+            wait_for = max(wake_at - now, 0) if wake_at is not None else None
+
+            if not self._futures:
+                time.sleep(wait_for or 0)
+                continue
+
+            done, _ = wait_futures(self._futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+            now = time.time()
+            for future in done:
+                task, is_submission = self._futures.pop(future)
+                self._handle(future, task, is_submission, now)
+
+    def wait_all(self, return_exceptions=False):
+        """
+        Waits for every task and returns their results in the order they were added.
+        If a task failed, raises its error, unless return_exceptions is True, in
+        which case the exception is returned in that task's slot.
+        """
+        for _ in self.as_completed():
+            pass
+
+        results = []
+        for task in self._tasks:
+            try:
+                results.append(task._outcome())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+
+def run_tasks(keys, submit, concurrency=32, timeout=300, schedule=None):
+    """
+    Runs one server task per key with at most `concurrency` tasks in flight.
+
+    submit(key) must start the task and return a Task (e.g. Agent.submit_response).
+    Submissions and polls share one TaskGroup, so every in-flight task is polled
+    on the same loop. Yields (key, result_or_error) in completion order; a failed
+    submission, failed task or timeout yields the exception as the second item
+    instead of aborting the whole run.
+    """
+    keys = iter(keys)
+    keyed = {}
+    max_workers = min(concurrency, current_client().pool_maxsize)
+
+    with TaskGroup(schedule=schedule, task_timeout=timeout, max_workers=max_workers) as group:
+        def top_up():
+            while group.pending < concurrency:
+                try:
+                    key = next(keys)
+                except StopIteration:
+                    return
+                keyed[group.submit(submit, key)] = key
+
+        top_up()
+        for task in group.as_completed():
+            key = keyed.pop(task)
+            top_up()
+            try:
+                outcome = task._outcome()
+            except Exception as e:
+                outcome = e
+            yield key, outcome
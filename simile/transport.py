@@ -0,0 +1,285 @@
+# simile/transport.py
+"""
+HTTP transports used by api_requestor.request.
+
+A transport sends one HTTP request and returns a response with status_code,
+headers (case-insensitive), text and json(). Connection failures and timeouts
+are raised as error.TransportError. Three transports are provided:
+  * RequestsTransport: a pooled keep-alive requests.Session (the default)
+  * Urllib3Transport: urllib3's PoolManager directly, with the same pooling and
+    retry policy but without the requests layer's per-call overhead
+  * InMemoryTransport: hands requests to an in-process app such as
+    mock_server.MockSimileApp, without any sockets (for tests)
+
+Select one with simile.configure(transport="urllib3") or pass an instance,
+e.g. simile.configure(transport=InMemoryTransport(MockSimileApp())). Pools
+are sized from the settings of the client that first uses the transport;
+Clients that inherit an instance from simile.config get their own clone().
+The HTTP libraries are only imported when a transport is first used.
+"""
+
+import abc
+import json as jsonlib
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from .client import current_client
+from .error import TransportError
+from .payload import decompress, is_one_shot
+
+# Status codes that are retried automatically (for idempotent methods only)
+RETRY_STATUS_CODES = (502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({"DELETE", "GET", "HEAD", "OPTIONS", "PUT", "TRACE"})
+
+
+class Headers(dict):
+    """Minimal case-insensitive header mapping."""
+    def __init__(self, headers=()):
+        super().__init__((name.lower(), value) for name, value in dict(headers).items())
+
+    def __getitem__(self, name):
+        return super().__getitem__(name.lower())
+
+    def __contains__(self, name):
+        return super().__contains__(name.lower())
+
+    def get(self, name, default=None):
+        return super().get(name.lower(), default)
+
+
+class Response:
+    """
+    Fully-read HTTP response. Mirrors the parts of requests.Response that the
+    rest of the library uses.
+    """
+    def __init__(self, status_code, headers, text):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+
+    def json(self):
+        return jsonlib.loads(self.text)
+
+
+def _encode_body(data, json):
+    if json is not None:
+        return jsonlib.dumps(json).encode("utf-8")
+    if isinstance(data, dict):
+        return urlencode(data, doseq=True).encode("utf-8")
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    return data
+
+
+def _clean_params(params):
+    # Like requests, drop parameters whose value is None
+    return {k: v for k, v in (params or {}).items() if v is not None}
+
+
+_retry_class = None
+
+
+def retry_policy():
+    """
+    Returns a urllib3 Retry for idempotent calls and 502/503/504 responses,
+    using the current client's retry count and a capped, jittered backoff.
+    """
+    global _retry_class
+    if _retry_class is None:
+        from urllib3.util.retry import Retry
+        from .api_requestor import _jittered
+
+        class _JitteredRetry(Retry):
+            """
+            urllib3 Retry with a configurable cap and random jitter on the backoff sleep,
+            so that many clients retrying at once don't hit the server in lockstep.
+            """
+            # 429s are left to the rate-limit governor (see api_requestor.request)
+            RETRY_AFTER_STATUS_CODES = frozenset({503})
+
+            def get_backoff_time(self):
+                return _jittered(min(super().get_backoff_time(), current_client().backoff_max))
+
+        _retry_class = _JitteredRetry
+
+    client = current_client()
+    return _retry_class(
+        total=client.max_retries,
+        backoff_factor=client.backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+class Transport(abc.ABC):
+    """
+    Base class for transports. Subclasses implement request() and, if they
+    hold connections, close(); a closed transport reconnects on next use.
+    """
+    @abc.abstractmethod
+    def request(self, method, url, params=None, data=None, json=None, headers=None, timeout=30):
+        """Sends one request and returns a Response; raises TransportError if it can't."""
+
+    def close(self):
+        pass
+
+    def clone(self):
+        """
+        Returns a new, unconnected transport like this one, for a Client that
+        inherits this transport from simile.config. Subclasses whose
+        constructor takes arguments override this.
+        """
+        return type(self)()
+
+
+class RequestsTransport(Transport):
+    """requests.Session with a pooled HTTPAdapter, shared between threads."""
+    def __init__(self):
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The underlying requests.Session, created on first use."""
+        session = self._session
+        if session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+                session = self._session
+        return session
+
+    def _build_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        client = current_client()
+        adapter = HTTPAdapter(
+            pool_connections=client.pool_connections,
+            pool_maxsize=client.pool_maxsize,
+            pool_block=client.pool_block,
+            max_retries=retry_policy(),
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, timeout=30):
+        import requests
+
+        try:
+            return self.session.request(
+                method=method,
+                url=url,
+                params=params,
+                data=data,
+                json=json,
+                headers=headers,
+                timeout=timeout
+            )
+        except requests.exceptions.RequestException as e:
+            raise TransportError(str(e)) from e
+
+    def close(self):
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+
+class Urllib3Transport(Transport):
+    """urllib3.PoolManager used directly; same pooling and retries as RequestsTransport."""
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        pool = self._pool
+        if pool is None:
+            import urllib3
+
+            client = current_client()
+            with self._lock:
+                if self._pool is None:
+                    self._pool = urllib3.PoolManager(
+                        num_pools=client.pool_connections,
+                        maxsize=client.pool_maxsize,
+                        block=client.pool_block,
+                        retries=retry_policy(),
+                    )
+                pool = self._pool
+        return pool
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, timeout=30):
+        import urllib3
+
+        params = _clean_params(params)
+        if params:
+            url += ("&" if "?" in url else "?") + urlencode(params, doseq=True)
+        body = _encode_body(data, json)
+        try:
+            raw = self._get_pool().request(
+                method.upper(),
+                url,
+                body=body,
+                headers=headers,
+                chunked=is_one_shot(body),
+                timeout=urllib3.Timeout(connect=timeout, read=timeout),
+                redirect=False,
+            )
+        except urllib3.exceptions.HTTPError as e:
+            raise TransportError(str(e)) from e
+        return Response(raw.status, raw.headers, raw.data.decode("utf-8", "replace"))
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.clear()
+
+
+class InMemoryTransport(Transport):
+    """
+    Calls app.handle(method, path, query, headers, body) -> (status, headers, body_bytes)
+    in-process, e.g. with a mock_server.MockSimileApp. There are no transport-level
+    retries; the governor's 429 handling still applies.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    def clone(self):
+        return type(self)(self.app)
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, timeout=30):
+        split = urlsplit(url)
+        path = split.path + (f"?{split.query}" if split.query else "")
+        query = {k: str(v) for k, v in _clean_params(params).items()}
+        body = _encode_body(data, json) or b""
+        if is_one_shot(body):
+            body = b"".join(body)
+        status, response_headers, body = self.app.handle(method, path, query, headers, body)
+        response_headers = Headers(response_headers)
+        if response_headers.get("Content-Encoding") in ("gzip", "deflate"):
+            body = decompress(body)
+        return Response(status, response_headers, body.decode("utf-8", "replace"))
+
+
+TRANSPORTS = {
+    "requests": RequestsTransport,
+    "urllib3": Urllib3Transport,
+}
+
+
+def build_transport(spec):
+    """Returns a Transport for a name in TRANSPORTS or a Transport instance."""
+    if isinstance(spec, Transport):
+        return spec
+    try:
+        return TRANSPORTS[spec]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown transport {spec!r}; use one of {', '.join(TRANSPORTS)} or a Transport instance."
+        ) from None
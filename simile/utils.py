@@ -1,8 +1,125 @@
 # simile/utils.py
 """
-Optional helper functions. You might or might not need this, depending on how you structure your code.
-For now, it's just a placeholder.
+Small helper functions shared across the library.
 """
 
-def example_helper():
-    pass
+import csv
+import hashlib
+import json
+import threading
+
+
+def canonical_json(obj):
+    """Serializes obj deterministically (sorted keys, no whitespace)."""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def canonical_hash(obj):
+    """
+    Stable SHA-256 hex digest of a JSON-compatible object. Equal payloads give
+    equal hashes regardless of dict ordering, so it can be used as a cache key
+    or request fingerprint.
+    """
+    return hashlib.sha256(canonical_json(obj).encode("utf-8")).hexdigest()
+
+
+def parse_retry_after(headers):
+    """Parses a numeric Retry-After header (seconds); returns None if absent/invalid."""
+    value = headers.get("Retry-After") if headers is not None else None
+    try:
+        return max(float(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_jsonl(path):
+    """Streams one record per non-empty line of a JSON Lines file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_csv(path, json_fields=("agent_data",)):
+    """
+    Streams one dict per row of a CSV file with a header row. Columns named in
+    json_fields hold JSON text (e.g. an agent_data list) and are decoded.
+    Empty cells are dropped so the callee's defaults apply.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            record = {}
+            for name, value in row.items():
+                if value is None or value == "":
+                    continue
+                record[name] = json.loads(value) if name in json_fields else value
+            yield record
+
+
+def _checkpoint_key(key):
+    # JSON turns tuples into lists; turn them back so keys stay hashable
+    if isinstance(key, list):
+        return tuple(_checkpoint_key(k) for k in key)
+    return key
+
+
+class Checkpoint:
+    """
+    Append-only JSON Lines record of completed work items, so an interrupted
+    bulk job can skip what already succeeded when it is rerun:
+
+        checkpoint = Checkpoint("import.ckpt")
+        if key not in checkpoint:
+            ...
+            checkpoint.add(key, result)
+
+    Keys must be JSON-serializable (tuples are fine). Each entry is flushed as
+    soon as it's added; a torn last line from a crash is ignored on load.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._completed = {}
+        torn = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    torn = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._completed[_checkpoint_key(entry["key"])] = entry.get("value")
+        except FileNotFoundError:
+            pass
+        self._file = open(path, "a", encoding="utf-8")
+        if torn:
+            # Don't glue the next entry onto a partially written line
+            self._file.write("\n")
+
+    def __contains__(self, key):
+        return key in self._completed
+
+    def __len__(self):
+        return len(self._completed)
+
+    def get(self, key, default=None):
+        return self._completed.get(key, default)
+
+    def add(self, key, value=None):
+        line = json.dumps({"key": key, "value": value}, ensure_ascii=False)
+        with self._lock:
+            self._completed[_checkpoint_key(key)] = value
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
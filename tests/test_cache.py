@@ -0,0 +1,118 @@
+# tests/test_cache.py
+import time
+
+import simile
+from simile.cache import DiskCache, MemoryCache, MetadataCache
+from simile.mock_server import API_PREFIX, MockSimileApp
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+GENERATE = "/generate_agent_response/"
+DETAILS = "/get_agent_details/"
+
+
+def _client(app, **settings):
+    return simile.Client("k", api_base=API_BASE, transport=InMemoryTransport(app), rate_limits={}, **settings)
+
+
+def _agent(client):
+    population_id = client.Population.create("p")["population_id"]
+    return population_id, client.Agent.create("Ada", "Lovelace", population_id=population_id)
+
+
+def test_memory_cache_hits_misses_and_lru_eviction():
+    cache = MemoryCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b", "missing") == "missing"
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3, "size": 2}
+
+
+def test_memory_cache_ttl_expiry():
+    cache = MemoryCache(ttl=0.1)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.15)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_disk_cache_persists_and_expires(tmp_path):
+    path = str(tmp_path / "responses.db")
+    cache = DiskCache(path)
+    cache.set("a", {"answer": [1, 2]})
+    cache.close()
+
+    cache = DiskCache(path, ttl=0.1)
+    assert cache.get("a") == {"answer": [1, 2]}
+    cache.set("b", "short-lived")
+    time.sleep(0.15)
+    assert cache.get("b") is None
+    cache.delete("a")
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    cache.close()
+
+
+def test_generate_response_is_served_from_the_response_cache():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    question = {"question": "hi"}
+    with _client(app, response_cache=MemoryCache()) as client:
+        _, agent_id = _agent(client)
+        first = client.Agent.generate_response(agent_id, "chat", question)
+        submitted = app.stats["by_endpoint"][GENERATE]
+        assert client.Agent.generate_response(agent_id, "chat", dict(question)) == first
+        assert app.stats["by_endpoint"][GENERATE] == submitted
+
+        client.Agent.generate_response(agent_id, "chat", question, use_cache=False)
+        client.Agent.generate_response(agent_id, "chat", {"question": "other"})
+        assert app.stats["by_endpoint"][GENERATE] == submitted + 2
+        assert client.response_cache.stats()["hits"] == 1
+
+
+def _requests(app, endpoint):
+    return app.stats["by_endpoint"].get(endpoint, 0)
+
+
+def test_metadata_cache_hit_miss_and_304_revalidation():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    cache = MetadataCache(ttl=0.1)
+    with _client(app, metadata_cache=cache) as client:
+        _, agent_id = _agent(client)
+        details = client.Agent.retrieve_details(agent_id)  # miss
+        before = _requests(app, DETAILS)
+        details["mutated"] = True
+        assert "mutated" not in client.Agent.retrieve_details(agent_id)  # fresh hit
+        assert _requests(app, DETAILS) == before
+
+        time.sleep(0.15)
+        assert client.Agent.retrieve_details(agent_id)["agent_id"] == agent_id  # stale: revalidated
+        assert _requests(app, DETAILS) == before + 1
+        assert cache.stats()["revalidations"] == 1
+        client.Agent.retrieve_details(agent_id)  # fresh again after the 304
+        assert _requests(app, DETAILS) == before + 1
+
+        client.Agent.retrieve_details(agent_id, refresh=True)
+        assert _requests(app, DETAILS) == before + 2
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+def test_metadata_cache_is_invalidated_by_writes():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    with _client(app, metadata_cache=MetadataCache(ttl=None)) as client:
+        population_id, first = _agent(client)
+        assert client.Population.get_agents(population_id)["agent_ids"] == [first]
+
+        second = client.Agent.create("Grace", "Hopper", population_id=population_id)
+        assert sorted(client.Population.get_agents(population_id)["agent_ids"]) == sorted([first, second])
+
+        client.Population.sync(population_id, [second])
+        assert client.Population.get_agents(population_id)["agent_ids"] == [second]
+
+        client.Agent.delete(second)
+        assert client.Population.get_agents(population_id)["agent_ids"] == []
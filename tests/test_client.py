@@ -0,0 +1,38 @@
+# tests/test_client.py
+import simile
+from simile import config
+from simile.mock_server import API_PREFIX, MockSimileApp
+from simile.resource_agent import RESPONSE_RESULT_ENDPOINT
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+
+
+def _tenant(app):
+    return simile.Client("tenant-key", api_base=API_BASE, transport=InMemoryTransport(app), rate_limits={})
+
+
+def test_tenant_built_task_polls_through_tenant():
+    app = MockSimileApp(task_latency=0.01, api_key="tenant-key", seed=1)
+    with _tenant(app) as tenant:
+        population_id = tenant.Population.create("p")["population_id"]
+        agent_id = tenant.Agent.create("Ada", "Lovelace", population_id=population_id)
+        task_id = tenant.Agent.submit_response(agent_id, "chat", {"question": "hi"}).task_id
+
+        # Built and waited outside any activate(): must still use the tenant
+        task = tenant.Task(task_id, RESPONSE_RESULT_ENDPOINT)
+        assert task._client is tenant
+        assert task.wait(timeout=10) is not None
+
+
+def test_inherited_transport_instance_is_not_shared(monkeypatch):
+    transport = InMemoryTransport(MockSimileApp())
+    monkeypatch.setattr(config, "transport", transport)
+    first, second = simile.Client("k1"), simile.Client("k2")
+    assert isinstance(first.transport, InMemoryTransport)
+    assert first.transport is not transport
+    assert first.transport is not second.transport
+    assert first.transport.app is transport.app
+
+    # An explicitly passed transport is used as is
+    assert simile.Client("k3", transport=transport).transport is transport
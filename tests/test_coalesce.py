@@ -0,0 +1,119 @@
+# tests/test_coalesce.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import simile
+from simile import coalesce
+from simile.coalesce import SingleFlight
+from simile.mock_server import API_PREFIX, MockSimileApp, constant
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+DETAILS = "/get_agent_details/"
+
+
+def test_concurrent_calls_share_one_call_with_independent_copies():
+    flights = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"agent_ids": ["a"]}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(lambda _: flights.do("k", fetch), range(5)))
+    assert len(calls) == 1
+    assert flights.stats() == {"calls": 5, "collapsed": 4, "in_flight": 0}
+    results[0]["agent_ids"].append("mutated")
+    assert all(result == {"agent_ids": ["a"]} for result in results[1:])
+    assert len({id(result) for result in results}) == 5
+
+
+def test_followers_share_the_leaders_error():
+    flights = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    def call(_):
+        with pytest.raises(ValueError):
+            flights.do("k", fail)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(call, range(3)))
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_async_calls_share_one_call_with_independent_copies():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"x": [1]}
+
+    async def main():
+        return await asyncio.gather(*(flights.do_async("k", fetch) for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    results[0]["x"].append(2)
+    assert all(result == {"x": [1]} for result in results[1:])
+
+
+def _client(app):
+    return simile.Client("k", api_base=API_BASE, transport=InMemoryTransport(app), rate_limits={})
+
+
+def _details_requests(app):
+    return app.stats["by_endpoint"].get(DETAILS, 0)
+
+
+def test_identical_reads_share_one_request():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    with _client(app) as client:
+        population_id = client.Population.create("p")["population_id"]
+        agent_id = client.Agent.create("Ada", "Lovelace", population_id=population_id)
+        before = _details_requests(app)
+        app.request_latency = constant(0.2)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda _: client.Agent.retrieve_details(agent_id), range(6)))
+    assert _details_requests(app) - before == 1
+    assert len({id(result) for result in results}) == 6
+
+
+def test_write_between_reads_stops_coalescing():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    with _client(app) as client:
+        population_id = client.Population.create("p")["population_id"]
+        agent_id = client.Agent.create("Ada", "Lovelace", population_id=population_id)
+        generation = client.write_generation
+        client.Population.add_agent(population_id, agent_id)
+        assert client.write_generation > generation
+
+        before = _details_requests(app)
+        app.request_latency = constant(0.3)
+        first = threading.Thread(target=client.Agent.retrieve_details, args=(agent_id,))
+        first.start()
+        time.sleep(0.1)
+        with client.activate():
+            coalesce.bump_generation()  # what every write does once it completes
+        client.Agent.retrieve_details(agent_id)
+        first.join()
+    assert _details_requests(app) - before == 2
+
+
+def test_write_generation_is_per_client():
+    first, second = simile.Client("k1"), simile.Client("k2")
+    with first.activate():
+        coalesce.bump_generation()
+        assert coalesce.generation() == 1
+    with second.activate():
+        assert coalesce.generation() == 0
@@ -0,0 +1,58 @@
+# tests/test_journal.py
+import simile
+from simile.journal import get_journal
+from simile.mock_server import API_PREFIX, MockSimileApp, constant
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+GENERATE = "/generate_agent_response/"
+QUESTION = {"question": "still there?"}
+
+
+def _client(app, journal):
+    return simile.Client(
+        "k", api_base=API_BASE, transport=InMemoryTransport(app), rate_limits={}, journal=journal
+    )
+
+
+def test_rerun_reattaches_instead_of_resubmitting(tmp_path):
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    journal = str(tmp_path / "tasks.db")
+
+    # First run: submits, then "dies" before the task finishes
+    with _client(app, journal) as client:
+        population_id = client.Population.create("p")["population_id"]
+        agent_id = client.Agent.create("Ada", "Lovelace", population_id=population_id)
+        app.task_latency = constant(0.3)
+        first = client.Agent.submit_response(agent_id, "chat", QUESTION)
+        assert [entry["task_id"] for entry in client.get_journal().pending()] == [first.task_id]
+    submitted = app.stats["by_endpoint"][GENERATE]
+
+    # Rerun: the identical submission reattaches to the running task
+    with _client(app, journal) as client:
+        task = client.Agent.submit_response(agent_id, "chat", dict(QUESTION))
+        assert task.task_id == first.task_id
+        assert app.stats["by_endpoint"][GENERATE] == submitted
+        assert task.wait(timeout=10) is not None
+        assert client.get_journal().pending() == []
+
+        # A finished task is not reattached to
+        assert client.Agent.submit_response(agent_id, "chat", QUESTION).task_id != first.task_id
+        assert app.stats["by_endpoint"][GENERATE] == submitted + 1
+
+
+def test_pending_tasks_can_be_waited_on_after_a_restart(tmp_path):
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    journal = str(tmp_path / "tasks.db")
+    with _client(app, journal) as client:
+        population_id = client.Population.create("p")["population_id"]
+        agent_id = client.Agent.create("Ada", "Lovelace", population_id=population_id)
+        app.task_latency = constant(0.2)
+        task_ids = {client.Agent.submit_response(agent_id, "chat", {"question": str(i)}).task_id for i in range(3)}
+
+    with _client(app, journal) as client, client.activate():
+        tasks = get_journal().pending_tasks()
+        assert {task.task_id for task in tasks} == task_ids
+        with client.TaskGroup(tasks) as group:
+            assert all(result is not None for result in group.wait_all())
+        assert client.get_journal().pending() == []
@@ -0,0 +1,72 @@
+# tests/test_payload.py
+import json
+
+import pytest
+
+import simile
+from simile.mock_server import API_PREFIX, MockSimileApp
+from simile.payload import CHUNK_SIZE, Stream, compress, decompress, encode_json
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+RECORDS = [{"speaker": "ada", "text": "x" * 100, "turn": i} for i in range(2000)]
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_compression_round_trip(encoding):
+    data = json.dumps(RECORDS).encode("utf-8")
+    compressed = compress(data, encoding)
+    assert len(compressed) < len(data)
+    assert decompress(compressed) == data
+
+
+def test_small_bodies_are_left_uncompressed():
+    client = simile.Client("k", compression="gzip", compression_threshold=1024)
+    with client.activate():
+        body, headers = encode_json({"agent_id": "a1"})
+        assert (body, headers) == (b'{"agent_id":"a1"}', {})
+
+        body, headers = encode_json({"agent_data": RECORDS})
+    assert headers == {"Content-Encoding": "gzip"}
+    assert json.loads(decompress(body)) == {"agent_data": RECORDS}
+
+
+def test_streamed_bodies_are_sent_in_chunks():
+    payload = {"first_name": "Ada", "agent_data": Stream(iter(RECORDS))}
+    with simile.Client("k").activate():
+        body, headers = encode_json(payload)
+        chunks = list(body)
+    assert headers == {}
+    assert len(chunks) > 1
+    assert all(len(chunk) < 2 * CHUNK_SIZE for chunk in chunks)
+    assert json.loads(b"".join(chunks)) == {"first_name": "Ada", "agent_data": RECORDS}
+
+
+def test_streamed_bodies_are_always_compressed_when_compression_is_on():
+    payload = {"agent_data": Stream(iter(RECORDS[:3]))}
+    with simile.Client("k", compression="deflate", compression_threshold=10 ** 9).activate():
+        body, headers = encode_json(payload)
+        compressed = b"".join(body)
+    assert headers == {"Content-Encoding": "deflate"}
+    assert json.loads(decompress(compressed)) == {"agent_data": RECORDS[:3]}
+
+
+def test_agent_data_streams_from_a_generator_end_to_end():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    client = simile.Client(
+        "k", api_base=API_BASE, transport=InMemoryTransport(app), rate_limits={}, compression="gzip"
+    )
+    with client:
+        population_id = client.Population.create("p")["population_id"]
+        agent_id = client.Agent.create(
+            "Ada", "Lovelace", population_id=population_id, agent_data=(record for record in RECORDS)
+        )
+    assert agent_id
+
+
+def test_agent_data_rejects_open_files(tmp_path):
+    path = tmp_path / "agents.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in RECORDS[:2]))
+    with open(path) as f:
+        with pytest.raises(TypeError, match="read_jsonl"):
+            simile.Agent.create("Ada", "Lovelace", population_id="p1", agent_data=f)
@@ -0,0 +1,164 @@
+# tests/test_rate_limit.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import simile
+from simile.mock_server import API_PREFIX, MockSimileApp
+from simile.rate_limit import AdaptiveLimiter, Governor, endpoint_class
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+
+
+def test_endpoint_classes():
+    assert endpoint_class("POST", "/generate_agent_response/") == "submit"
+    assert endpoint_class("GET", "/generate_agent_response_result/t1/") == "poll"
+    assert endpoint_class("GET", "/get_agent_details/") == "metadata"
+    assert endpoint_class("POST", "/delete_agent/") == "metadata"
+
+
+def test_governor_has_per_class_limits():
+    governor = Governor({"submit": {"max_in_flight": 4}, "poll": {"rate": 50}})
+    assert governor.limiter("POST", "/create_single_agent/").stats()["limit"] == 4
+    assert governor.limiter("GET", "/get_sub_population_result/t1/").stats()["rate"] == 50
+    assert governor.stats()["metadata"] == {"in_flight": 0, "limit": None, "rate": None, "throttled": 0}
+    with pytest.raises(ValueError):
+        Governor({"bogus": {}})
+
+
+def test_throttling_halves_limits_and_successes_restore_them():
+    limiter = AdaptiveLimiter(rate=1000, max_in_flight=8)
+    for _ in range(8):
+        limiter.acquire()
+    limiter.release(429)
+    assert limiter.stats() == {"in_flight": 7, "limit": 4, "rate": 500, "throttled": 1}
+
+    for _ in range(7):
+        limiter.release(200)
+    while limiter.stats()["limit"] < 8:
+        limiter.acquire()
+        limiter.release(200)
+    stats = limiter.stats()
+    assert stats["limit"] == 8
+    assert stats["rate"] == 1000
+
+    # Never grows past the configured values
+    for _ in range(50):
+        limiter.acquire()
+        limiter.release(200)
+    assert limiter.stats()["limit"] == 8
+    assert limiter.stats()["rate"] == 1000
+
+
+def test_learned_cap_is_dropped_after_recovery():
+    limiter = AdaptiveLimiter()
+    for _ in range(4):
+        limiter.acquire()
+    limiter.release(503)
+    assert limiter.stats()["limit"] == 2
+    for _ in range(3):
+        limiter.release(200)
+    while limiter.stats()["limit"] is not None:
+        limiter.acquire()
+        limiter.release(200)
+    assert limiter.stats()["limit"] is None
+
+
+def test_retry_after_pauses_new_calls():
+    limiter = AdaptiveLimiter()
+    limiter.acquire()
+    limiter.release(429, retry_after=0.2)
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+
+
+def test_threads_stay_under_the_cap():
+    limiter = AdaptiveLimiter(max_in_flight=3)
+    lock = threading.Lock()
+    in_flight = peak = 0
+
+    def call(_):
+        nonlocal in_flight, peak
+        limiter.acquire()
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.005)
+        with lock:
+            in_flight -= 1
+        limiter.release(200)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(call, range(64)))
+    assert peak == 3
+
+
+def test_async_waiters_are_woken_by_release():
+    limiter = AdaptiveLimiter(max_in_flight=2)
+    in_flight = peak = 0
+
+    async def call():
+        nonlocal in_flight, peak
+        await limiter.acquire_async()
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        limiter.release(200)
+
+    async def main():
+        started = time.monotonic()
+        await asyncio.gather(*(call() for _ in range(400)))
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(main())
+    assert peak == 2
+    assert limiter.stats()["in_flight"] == 0
+    # 200 rounds of ~1 ms; a 10 ms polling wait would take seconds
+    assert elapsed < 1.5
+
+
+def test_release_from_another_thread_wakes_an_async_waiter():
+    limiter = AdaptiveLimiter(max_in_flight=1)
+    limiter.acquire()
+
+    async def main():
+        threading.Timer(0.05, limiter.release, (200,)).start()
+        await asyncio.wait_for(limiter.acquire_async(), timeout=2)
+
+    asyncio.run(main())
+    assert limiter.stats()["in_flight"] == 1
+
+
+def test_cancelled_async_waiter_passes_its_wakeup_on():
+    limiter = AdaptiveLimiter(max_in_flight=1)
+
+    async def main():
+        await limiter.acquire_async()
+        first = asyncio.ensure_future(limiter.acquire_async())
+        second = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0)
+        first.cancel()
+        limiter.release(200)
+        await asyncio.wait_for(second, timeout=2)
+
+    asyncio.run(main())
+    assert limiter.stats()["in_flight"] == 1
+
+
+def test_client_backs_off_a_throttling_server():
+    app = MockSimileApp(max_requests_per_second=50, retry_after=0.05, seed=1)
+    client = simile.Client("k", api_base=API_BASE, transport=InMemoryTransport(app), max_retries=20)
+    with client:
+        population_id = client.Population.create("p")["population_id"]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: client.Population.get_agents(population_id, refresh=True), range(80)))
+        metadata = client.get_governor().stats()["metadata"]
+    assert app.stats["throttled"] >= 1
+    assert metadata["throttled"] >= 1
+    assert metadata["in_flight"] == 0
@@ -0,0 +1,132 @@
+# tests/test_resilience.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import simile
+from simile.error import CircuitOpenError
+from simile.mock_server import API_PREFIX, MockSimileApp, constant
+from simile.resilience import CircuitBreaker, Resilience
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+
+
+def test_hedge_budget_holds_under_concurrency():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    hedging = {"min_samples": 5, "quantile": 0.5, "min_delay": 0.01, "max_ratio": 0.1}
+    client = simile.Client(
+        "k", api_base=API_BASE, transport=InMemoryTransport(app), rate_limits={}, hedging=hedging, pool_maxsize=64
+    )
+    with client:
+        population_id = client.Population.create("p")["population_id"]
+        agent_id = client.Agent.create("Ada", "Lovelace", population_id=population_id)
+        app.task_latency = constant(60)
+        tasks = [client.Agent.submit_response(agent_id, "chat", {"question": str(i)}) for i in range(35)]
+        for task in tasks[:5]:
+            task.poll()
+
+        # Every poll now outlasts the hedge delay
+        app.request_latency = constant(0.2)
+        with ThreadPoolExecutor(max_workers=30) as executor:
+            list(executor.map(lambda task: task.poll(), tasks[5:]))
+
+        stats = client.get_resilience().stats()["/generate_agent_response_result/{task_id}/"]
+    assert stats["requests"] == 35
+    assert 1 <= stats["hedged"] <= 0.1 * stats["requests"]
+
+
+def test_hedge_delay_starts_when_the_request_is_sent():
+    resilience = Resilience(hedging=True, max_workers=1)
+    resilience._endpoint("/e/")  # no samples needed: call() is given the delay
+    resilience._endpoint("/e/").requests = 100
+    gate = threading.Event()
+    calls = []
+
+    def send(started=None):
+        calls.append(started)
+        if started is not None:
+            gate.wait()
+            started()
+        time.sleep(0.05)
+        return "ok"
+
+    # Queued behind a busy worker for longer than the delay: no hedge
+    blocker = resilience._get_executor().submit(gate.wait)
+    threading.Timer(0.2, gate.set).start()
+    assert resilience.call("/e/", 0.1, send) == "ok"
+    blocker.result()
+    assert len(calls) == 1
+    assert resilience.stats()["/e/"]["hedged"] == 0
+    resilience.close()
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("/e/", failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        breaker.record(breaker.before_call(), False)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_success_resets_failures():
+    breaker = CircuitBreaker("/e/", failure_threshold=2, reset_timeout=60)
+    breaker.record(breaker.before_call(), False)
+    breaker.record(breaker.before_call(), True)
+    breaker.record(breaker.before_call(), False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def _opened(reset_timeout=0.05):
+    breaker = CircuitBreaker("/e/", failure_threshold=1, reset_timeout=reset_timeout)
+    old = breaker.before_call()  # started before the circuit opened
+    breaker.record(breaker.before_call(), False)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker, old
+
+
+def test_breaker_ignores_late_success_from_before_opening():
+    breaker, old = _opened(reset_timeout=60)
+    breaker.record(old, True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_breaker_half_open_lets_one_trial_through():
+    breaker, old = _opened()
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    trial = breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # A stale outcome neither resolves half-open nor frees the trial slot
+    breaker.record(old, True)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(trial, True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(old, False)
+    assert breaker.stats()["failures"] == 0
+
+
+def test_breaker_failed_trial_reopens():
+    breaker, _ = _opened()
+    time.sleep(0.06)
+    breaker.record(breaker.before_call(), False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened"] == 2
+
+
+def test_breaker_cancelled_trial_frees_the_slot():
+    breaker, _ = _opened()
+    time.sleep(0.06)
+    breaker.record(breaker.before_call(), None)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(breaker.before_call(), True)
+    assert breaker.state == CircuitBreaker.CLOSED
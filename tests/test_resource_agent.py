@@ -0,0 +1,41 @@
+# tests/test_resource_agent.py
+import asyncio
+
+import simile
+from simile.mock_server import API_PREFIX, MockSimileApp, MockSimileServer
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+RECORDS = [{"first_name": "Ada", "last_name": str(i)} for i in range(4)]
+
+
+def test_create_many_invalidates_membership_before_yielding():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    client = simile.Client(
+        "k", api_base=API_BASE, transport=InMemoryTransport(app), rate_limits={},
+        metadata_cache=simile.MetadataCache(),
+    )
+    with client:
+        population_id = client.Population.create("p")["population_id"]
+        assert client.Population.get_agents(population_id)["agent_ids"] == []
+        created = []
+        for _, agent_id in client.Agent.create_many(RECORDS, population_id, concurrency=2):
+            created.append(agent_id)
+            assert set(client.Population.get_agents(population_id)["agent_ids"]) >= set(created)
+
+
+def test_async_create_many_invalidates_membership_before_yielding():
+    async def main(server):
+        async with simile.Client(
+            "k", api_base=server.url, rate_limits={}, metadata_cache=simile.MetadataCache()
+        ) as client:
+            population_id = (await client.AsyncPopulation.create("p"))["population_id"]
+            assert (await client.AsyncPopulation.get_agents(population_id))["agent_ids"] == []
+            created = []
+            async for _, agent_id in client.AsyncAgent.create_many(RECORDS, population_id, concurrency=2):
+                created.append(agent_id)
+                members = (await client.AsyncPopulation.get_agents(population_id))["agent_ids"]
+                assert set(members) >= set(created)
+
+    with MockSimileServer(task_latency=0.01, seed=1) as server:
+        asyncio.run(main(server))
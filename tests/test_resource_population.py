@@ -0,0 +1,77 @@
+# tests/test_resource_population.py
+import asyncio
+
+import simile
+from simile.mock_server import API_PREFIX, MockSimileApp, MockSimileServer
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+ADD, REMOVE = "/population_add_agent/", "/population_remove_agent/"
+
+
+def _client(app):
+    return simile.Client("k", api_base=API_BASE, transport=InMemoryTransport(app), rate_limits={})
+
+
+def _setup(client, count=4):
+    population_id = client.Population.create("p")["population_id"]
+    agent_ids = [a for _, a in client.Agent.create_many(
+        [{"first_name": "Ada", "last_name": str(i)} for i in range(count)], population_id
+    )]
+    return population_id, sorted(agent_ids)
+
+
+def _writes(app):
+    by_endpoint = app.stats["by_endpoint"]
+    return by_endpoint.get(ADD, 0) + by_endpoint.get(REMOVE, 0)
+
+
+def test_sync_dry_run_reports_the_diff_without_changes():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    with _client(app) as client:
+        population_id, (a, b, c, d) = _setup(client)
+        other = client.Population.create("q")["population_id"]
+        extra = client.Agent.create("Grace", "Hopper", population_id=other)
+
+        summary = client.Population.sync(population_id, [a, b, extra], dry_run=True)
+        assert summary == {
+            "population_id": population_id, "dry_run": True,
+            "added": [extra], "removed": sorted([c, d]), "unchanged": 2, "errors": [],
+        }
+        assert _writes(app) == 0
+        assert sorted(client.Population.get_agents(population_id)["agent_ids"]) == [a, b, c, d]
+
+        summary = client.Population.sync(population_id, [a, b, extra])
+        assert (summary["added"], summary["removed"]) == ([extra], sorted([c, d]))
+        assert sorted(client.Population.get_agents(population_id)["agent_ids"]) == sorted([a, b, extra])
+        assert _writes(app) == 3
+
+        # Rerunning a finished sync changes nothing
+        summary = client.Population.sync(population_id, [a, b, extra])
+        assert (summary["added"], summary["removed"], summary["unchanged"]) == ([], [], 3)
+        assert _writes(app) == 3
+
+
+def test_sync_reports_failed_changes():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    with _client(app) as client:
+        population_id, agent_ids = _setup(client, count=2)
+        summary = client.Population.sync(population_id, agent_ids + ["agent_missing"])
+    assert summary["added"] == []
+    assert [(operation, agent_id) for operation, agent_id, _ in summary["errors"]] == [("add", "agent_missing")]
+
+
+def test_async_sync_dry_run():
+    async def main(server):
+        async with simile.Client("k", api_base=server.url, rate_limits={}) as client:
+            population_id = (await client.AsyncPopulation.create("p"))["population_id"]
+            agent_id = await client.AsyncAgent.create("Ada", "Lovelace", population_id=population_id)
+            planned = await client.AsyncPopulation.sync(population_id, [], dry_run=True)
+            members = (await client.AsyncPopulation.get_agents(population_id))["agent_ids"]
+            done = await client.AsyncPopulation.sync(population_id, [])
+            return agent_id, planned, members, done
+
+    with MockSimileServer(task_latency=0.01, seed=1) as server:
+        agent_id, planned, members, done = asyncio.run(main(server))
+    assert planned["removed"] == [agent_id] and members == [agent_id]
+    assert done["removed"] == [agent_id]
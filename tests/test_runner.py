@@ -0,0 +1,55 @@
+# tests/test_runner.py
+import json
+import os
+
+import simile
+from simile import config, runner
+from simile.mock_server import MockSimileServer
+
+
+def _agents(server, count):
+    with simile.Client("k", api_base=server.url, rate_limits={}) as client:
+        population_id = client.Population.create("p")["population_id"]
+        return population_id, [a for _, a in client.Agent.create_many(
+            [{"first_name": "Ada", "last_name": str(i)} for i in range(count)], population_id
+        )]
+
+
+def test_rerun_skips_checkpointed_pairs_and_clears_fixed_errors(tmp_path, monkeypatch):
+    out = str(tmp_path / "run")
+    with MockSimileServer(task_latency=0.01, seed=1) as server:
+        monkeypatch.setattr(config, "api_key", "k")
+        monkeypatch.setattr(config, "api_base", server.url)
+        population_id, agent_ids = _agents(server, 6)
+        job = {
+            "populations": [population_id],
+            "questions": [{"id": "q1", "type": "chat", "payload": {"question": "hi"}}],
+        }
+
+        def run():
+            counts = []
+            summary = runner.run(job, out, processes=2, concurrency=4, timeout=10, progress=counts.append)
+            return summary, {key: sum(c[key] for c in counts) for key in ("completed", "failed", "skipped")}
+
+        # Every task fails on the first run
+        server.app.task_failure_rate = 1.0
+        summary, counts = run()
+        assert counts == {"completed": 0, "failed": 6, "skipped": 0}
+        assert summary["failed"] == len(summary["errors"]) == 6
+
+        server.app.task_failure_rate = 0.0
+        summary, counts = run()
+        assert counts == {"completed": 6, "failed": 0, "skipped": 0}
+        assert (summary["completed"], summary["failed"]) == (6, 0)
+        assert summary["errors"] == []
+        assert summary["columns"]["error"] == [None] * 6
+
+        submitted = server.app.stats["by_endpoint"]["/generate_agent_response/"]
+        summary, counts = run()
+        assert counts == {"completed": 0, "failed": 0, "skipped": 6}
+        assert server.app.stats["by_endpoint"]["/generate_agent_response/"] == submitted
+        assert summary["completed"] == 6
+
+    with open(os.path.join(out, runner.MANIFEST)) as f:
+        assert json.load(f) == {"shards": 2}
+    assert sorted(summary["agents"]) == sorted(agent_ids)
@@ -0,0 +1,85 @@
+# tests/test_sampling.py
+import pytest
+
+import simile
+from simile.mock_server import API_PREFIX, MockSimileApp
+from simile.sampling import Sampler, allocate
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+
+
+@pytest.fixture(scope="module")
+def population():
+    """A client and a population of 30 agents: 15 "x", 10 "y" and 5 "z" speech patterns."""
+    app = MockSimileApp(task_latency=0.001, seed=1)
+    patterns = ["x"] * 15 + ["y"] * 10 + ["z"] * 5
+    records = [
+        {"first_name": "Ada", "last_name": str(i), "speech_pattern": pattern}
+        for i, pattern in enumerate(patterns)
+    ]
+    with simile.Client("k", api_base=API_BASE, transport=InMemoryTransport(app), rate_limits={}) as client:
+        population_id = client.Population.create("p")["population_id"]
+        list(client.Agent.create_many(records, population_id))
+        yield client, population_id
+
+
+def test_allocate_proportional_and_equal():
+    sizes = {"x": 15, "y": 10, "z": 5}
+    assert allocate(12, sizes) == {"x": 6, "y": 4, "z": 2}
+    assert sum(allocate(7, sizes).values()) == 7
+    assert allocate(12, sizes, "equal") == {"x": 4, "y": 4, "z": 4}
+    # Full strata hand their share to the others
+    assert allocate(20, sizes, "equal") == {"x": 8, "y": 7, "z": 5}
+    assert allocate(4, sizes, {"x": 1, "z": 3}) == {"x": 1, "z": 3}
+
+
+def test_allocate_rejects_impossible_counts():
+    sizes = {"x": 15, "y": 10, "z": 5}
+    with pytest.raises(ValueError):
+        allocate(-1, sizes)
+    with pytest.raises(ValueError):
+        allocate(31, sizes)
+    with pytest.raises(ValueError):
+        allocate(0, sizes, {"z": 6})
+    with pytest.raises(ValueError):
+        allocate(0, sizes, {"w": 1})
+    with pytest.raises(ValueError):
+        allocate(3, sizes, "weird")
+
+
+def test_seeded_draws_are_reproducible(population):
+    client, population_id = population
+    with client.activate():
+        first, second = Sampler(population_id, seed=7), Sampler(population_id, seed=7)
+        assert len(first) == 30
+        assert first.uniform(5) == second.uniform(5)
+        assert first.samples(4, 6, by="speech_pattern") == second.samples(4, 6, by="speech_pattern")
+        # Draw k of samples() only depends on (seed, k)
+        assert first.samples(5, 6)[3] == second.samples(4, 6)[3]
+        assert len(set(first.uniform(30))) == 30
+
+
+def test_stratified_draws_follow_the_allocation(population):
+    client, population_id = population
+    with client.activate():
+        sampler = Sampler(population_id, seed=3)
+        groups = sampler.strata("speech_pattern")
+        drawn = sampler.stratified(12, by="speech_pattern")
+    assert len(drawn) == len(set(drawn)) == 12
+    counts = {stratum: len(set(drawn) & set(ids)) for stratum, ids in groups.items()}
+    assert counts == {"x": 6, "y": 4, "z": 2}
+
+
+def test_draws_larger_than_the_population_fail(population):
+    client, population_id = population
+    with client.activate():
+        sampler = Sampler(population_id, seed=1)
+        with pytest.raises(ValueError):
+            sampler.uniform(31)
+        with pytest.raises(ValueError):
+            sampler.stratified(31, by="speech_pattern")
+        with pytest.raises(ValueError):
+            sampler.samples(2, 31, by="speech_pattern")
+        with pytest.raises(ValueError):
+            sampler.uniform(-1)
@@ -0,0 +1,148 @@
+# tests/test_task.py
+import asyncio
+import threading
+
+import simile
+from simile import instrumentation
+from simile.error import RequestError
+from simile.mock_server import API_PREFIX, MockSimileApp, MockSimileServer, constant
+from simile.task import PollSchedule
+from simile.transport import InMemoryTransport
+
+API_BASE = "http://simile.test" + API_PREFIX
+FAST = PollSchedule(initial=0.05, jitter=0)
+BREAKER = {"failure_threshold": 2, "reset_timeout": 0.5}
+
+
+def _client(app, **settings):
+    settings.setdefault("rate_limits", {})
+    return simile.Client("k", api_base=API_BASE, transport=InMemoryTransport(app), **settings)
+
+
+def _agent(client):
+    population_id = client.Population.create("p")["population_id"]
+    return client.Agent.create("Ada", "Lovelace", population_id=population_id)
+
+
+def _flap(app, seconds):
+    """Answers every request with a 503 for the given time."""
+    app.http_error_rate = 1.0
+    threading.Timer(seconds, setattr, (app, "http_error_rate", 0.0)).start()
+
+
+def test_wait_survives_5xx_and_open_circuit():
+    app = MockSimileApp(task_latency=0.05, seed=1)
+    with _client(app, circuit_breaker=BREAKER) as client:
+        task = client.Agent.submit_response(_agent(client), "chat", {"question": "q"})
+        _flap(app, 0.3)
+        assert task.wait(schedule=FAST, timeout=10) is not None
+        breaker = client.get_resilience().stats()["/generate_agent_response_result/{task_id}/"]
+    assert breaker["opened"] >= 1
+    assert breaker["rejected"] >= 1
+    assert breaker["state"] == "closed"
+
+
+def test_async_wait_survives_5xx_and_open_circuit():
+    async def main(server):
+        async with simile.Client("k", api_base=server.url, rate_limits={}, max_retries=0, circuit_breaker=BREAKER) as client:
+            population_id = (await client.AsyncPopulation.create("p"))["population_id"]
+            agent_id = await client.AsyncAgent.create("Ada", "Lovelace", population_id=population_id)
+            task = await client.AsyncAgent.submit_response(agent_id, "chat", {"question": "q"})
+            _flap(server.app, 0.3)
+            result = await task.wait(schedule=FAST, timeout=10)
+            return result, client.get_resilience().stats()["/generate_agent_response_result/{task_id}/"]
+
+    with MockSimileServer(task_latency=0.05, seed=1) as server:
+        result, breaker = asyncio.run(main(server))
+    assert result is not None
+    assert breaker["rejected"] >= 1
+
+
+def test_failed_submission_emits_no_task_events():
+    events = []
+    instrumentation.reset()
+    instrumentation.add_task_hook(lambda event, task, info: events.append((event, task.task_id)))
+
+    def submit():
+        raise RequestError("Request error: refused", status_code=400)
+
+    try:
+        with _client(MockSimileApp()) as client, client.TaskGroup() as group:
+            task = group.submit(submit)
+            group.wait_all(return_exceptions=True)
+    finally:
+        instrumentation.clear_hooks()
+    assert isinstance(task.error, RequestError)
+    assert events == []
+    assert instrumentation.snapshot()["tasks"] == {}
+
+
+def _submit_with_latency(client, app, agent_id, latency):
+    app.task_latency = constant(latency)
+    return client.Agent.submit_response(agent_id, "chat", {"question": str(latency)})
+
+
+def test_poll_schedule_backs_off_to_max_interval():
+    schedule = PollSchedule(initial=0.25, factor=2, max_interval=1, jitter=0)
+    assert [schedule.delay(polls) for polls in range(1, 6)] == [0.25, 0.5, 1, 1, 1]
+    jittered = PollSchedule(initial=1, jitter=0.2)
+    assert all(0.8 <= jittered.delay(1) <= 1.2 for _ in range(50))
+
+
+def test_task_group_yields_in_completion_order():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    schedule = PollSchedule(initial=0.02, factor=1, jitter=0)
+    with _client(app) as client:
+        agent_id = _agent(client)
+        tasks = [_submit_with_latency(client, app, agent_id, latency) for latency in (0.45, 0.05, 0.25)]
+        with client.TaskGroup(tasks, schedule=schedule) as group:
+            order = [tasks.index(task) for task in group.as_completed()]
+            results = group.wait_all()
+    assert order == [1, 2, 0]
+    assert all(result is not None for result in results)
+
+
+def test_task_group_retries_5xx_on_the_next_poll():
+    app = MockSimileApp(task_latency=0.05, seed=1)
+    with _client(app) as client:
+        task = client.Agent.submit_response(_agent(client), "chat", {"question": "q"})
+        _flap(app, 0.2)
+        with client.TaskGroup([task], schedule=FAST, task_timeout=10) as group:
+            result, = group.wait_all()
+    assert app.stats["errors"] >= 1
+    assert result is not None
+    assert task.error is None
+
+
+def test_task_group_times_out_a_task():
+    app = MockSimileApp(task_latency=0.01, seed=1)
+    with _client(app) as client:
+        agent_id = _agent(client)
+        slow = _submit_with_latency(client, app, agent_id, 60)
+        fast = _submit_with_latency(client, app, agent_id, 0.01)
+        with client.TaskGroup([slow, fast], schedule=FAST, task_timeout=0.3) as group:
+            outcomes = group.wait_all(return_exceptions=True)
+    assert isinstance(outcomes[0], TimeoutError)
+    assert outcomes[1] is not None and not isinstance(outcomes[1], Exception)
+
+
+def test_run_tasks_polls_less_than_a_fixed_interval():
+    app = MockSimileApp(task_latency=0.6, seed=1)
+    schedule = PollSchedule(initial=0.05, factor=1.6, max_interval=1, jitter=0)
+    with _client(app) as client:
+        agent_id = _agent(client)
+        polls_before = app.stats["by_endpoint"].get("/generate_agent_response_result/{task_id}/", 0)
+
+        def submit(key):
+            if key == "bad":
+                raise RequestError("Request error: refused", status_code=400)
+            return client.Agent.submit_response(agent_id, "chat", {"question": key})
+
+        keys = [str(i) for i in range(8)] + ["bad"]
+        outcomes = dict(client.run_tasks(keys, submit, concurrency=9, schedule=schedule))
+        polls = app.stats["by_endpoint"]["/generate_agent_response_result/{task_id}/"] - polls_before
+    assert set(outcomes) == set(keys)
+    assert isinstance(outcomes.pop("bad"), RequestError)
+    assert not any(isinstance(outcome, Exception) for outcome in outcomes.values())
+    # Polling every schedule.initial seconds would take 0.6 / 0.05 = 12 polls per task
+    assert polls < 8 * 12